@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Rolling-origin backtest of the resilience forecasts, fully offline
+- Replays the historical panel (indicator cube history when available,
+  otherwise the historical years of resilience_timeline_2019_2030.json)
+  from several origins: fit on the years up to the origin, forecast the rest
+- The overall score is forecast as forecast_resilience.py does: anchored on
+  the last score by the pillar share (timeline rows blended with INFORM), or
+  from the score series alone for rows without pillar data
+- Scores every forecast with MAE, CRPS (quantile-grid approximation) and
+  50%/90% interval coverage, vectorized over country x metric x horizon
+- Records fit time per model variant (untraced) and, in a separate traced
+  pass at the latest origin, peak memory; origins run in a process pool
+
+Usage:
+    python backtest_forecasts.py [--origins 2021,2022,2023,2024] [--horizon 5]
+                                 [--variants bsts_dfm,bsts,naive] [--workers 4] [--no-memory]
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+from scipy import stats
+
+from bsts_model import quantile_name
+from forecast_resilience import (PILLARS, METRICS, METRIC_MIX, SCORE_MIX, DEFAULT_SEED, DEFAULT_FACTORS,
+                                 zero_percentile_weights, factor_forecast, forecast_countries,
+                                 anchor_overall, score_only_forecasts)
+from fetch_live_data import score_history
+from indicator_store import load_cube
+from pillar_scoring import pillar_share
+
+TIMELINE_FILE = 'resilience_timeline_2019_2030.json'
+DATA_FILE = 'resilience_data_complete.json'
+OUTPUT_FILE = 'backtest_results.json'
+DEFAULT_DRAWS = 1000
+MIN_TRAIN_YEARS = 3
+
+# Quantile grid for the CRPS approximation; includes the 50% and 90% interval edges
+SCORE_QUANTILES = tuple(np.round(np.arange(0.05, 0.951, 0.05), 2))
+
+# name -> (model, common factors, zero-percentile weighting)
+VARIANTS = {
+    'bsts_dfm': ('bsts', DEFAULT_FACTORS, True),
+    'bsts': ('bsts', 0, True),
+    'bsts_dfm_unweighted': ('bsts', DEFAULT_FACTORS, False),
+    'naive': ('naive', 0, False)
+}
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def load_panel(source='auto', timeline_file=TIMELINE_FILE, data_file=DATA_FILE):
+    """
+    (source, labels, years, pillar panel [country, pillar, year], overall
+    [country, year], pillar shares [country]) from the indicator cube's
+    scored history (overall = pillar average, share 1), or from the
+    historical part of the timeline JSON (shares from the merged records).
+    Countries without an overall score are dropped.
+    """
+    cube = load_cube() if source in ('auto', 'cube') else None
+    if cube:
+        history = score_history(cube)
+        labels = sorted(history)
+        years = list(cube.years)
+        panel = np.array([[history[iso3][p] for p in PILLARS] for iso3 in labels], dtype=np.float64)
+        overall = np.array([history[iso3]['overall'] for iso3 in labels], dtype=np.float64)
+        shares = np.ones(len(labels))
+    elif source == 'cube':
+        raise FileNotFoundError("no indicator cube; run fetch_live_data.py first")
+    else:
+        with open(timeline_file, 'r') as f:
+            timeline = json.load(f)
+        years = sorted({int(y) for c in timeline for y, v in c['timeline'].items() if v['type'] == 'historical'})
+        labels = [c['iso3'] or c['name'] or str(i) for i, c in enumerate(timeline)]
+
+        def value(c, year, metric):
+            entry = c['timeline'].get(str(year))
+            return np.nan if entry is None or entry['type'] != 'historical' else entry.get(metric, np.nan)
+
+        panel = np.array([[[value(c, y, p) for y in years] for p in PILLARS] for c in timeline], dtype=np.float64)
+        overall = np.array([[value(c, y, 'overall') for y in years] for c in timeline], dtype=np.float64)
+        records = {}
+        if os.path.exists(data_file):
+            with open(data_file, 'r') as f:
+                records = {c['iso3']: c for c in json.load(f) if c.get('iso3')}
+        # Without the merged record: World Bank score, or score-only without pillar history
+        shares = np.array([pillar_share(records[c['iso3']]) if c['iso3'] in records
+                           else float(np.nan_to_num(panel[i]).any()) for i, c in enumerate(timeline)])
+    keep = np.nan_to_num(overall[:, -1]) > 0
+    return (('cube' if cube else 'timeline'), [l for l, k in zip(labels, keep) if k], years,
+            panel[keep], overall[keep], shares[keep])
+
+
+def naive_forecast(history, h, quantiles):
+    """
+    No-change benchmark on [country, metric, year] histories: last value as
+    the mean, normal bands from the spread of past year-on-year changes
+    growing with sqrt(horizon).
+    """
+    last = history[..., -1]
+    spread = np.nan_to_num(np.nanstd(np.diff(history, axis=-1), axis=-1))
+    steps = np.sqrt(np.arange(1, h + 1))
+    out = {'mean': np.repeat(last[..., None], h, axis=-1)}
+    for q in quantiles:
+        out[quantile_name(q)] = last[..., None] + stats.norm.ppf(q) * spread[..., None] * steps
+    return out
+
+
+def score_forecasts(forecast, actual, quantiles=SCORE_QUANTILES):
+    """
+    Score sums over countries, each [metric, h], for forecasts and actuals
+    shaped [country, metric, h] (NaN actuals are skipped):
+    n, abs_error, crps, cover50, cover90.
+    CRPS is approximated by twice the mean pinball loss over the quantile grid.
+    """
+    observed = ~np.isnan(actual)
+    y = np.where(observed, actual, 0.0)
+    levels = np.asarray(quantiles)[:, None, None, None]
+    predicted = np.stack([forecast[quantile_name(q)] for q in quantiles])
+    pinball = ((y < predicted) - levels) * (predicted - y)
+    crps = 2 * pinball.mean(axis=0)
+
+    def inside(lower, upper):
+        return (y >= forecast[quantile_name(lower)]) & (y <= forecast[quantile_name(upper)])
+
+    scores = {
+        'n': observed,
+        'abs_error': np.abs(forecast['mean'] - y),
+        'crps': crps,
+        'cover50': inside(0.25, 0.75),
+        'cover90': inside(0.05, 0.95)
+    }
+    return {name: np.where(observed, values, 0).sum(axis=0).astype(np.float64) for name, values in scores.items()}
+
+
+def run_origin(variant, origin, years, panel, overall, shares, horizon, n_draws, seed=DEFAULT_SEED,
+               trace_memory=False):
+    """
+    Fit one variant on the years up to `origin`, forecast the following
+    years (at most `horizon`) and score them. Fit time covers the model
+    only, not the scoring. With trace_memory the fit is repeated under
+    tracemalloc for its peak memory; tracing slows the fit many times over,
+    so it never overlaps the timed pass.
+    """
+    model, n_factors, weighted = VARIANTS[variant]
+    t = years.index(origin) + 1
+    h = min(horizon, len(years) - t)
+    train = panel[..., :t]
+    metrics = np.concatenate([np.einsum('mp,cpt->cmt', METRIC_MIX[:len(PILLARS)], panel),
+                              overall[:, None, :]], axis=1)
+
+    def fit():
+        if model == 'naive':
+            # No change from the last observed pillars and overall score
+            return naive_forecast(metrics[..., :t], h, SCORE_QUANTILES)
+        weights = zero_percentile_weights(np.nan_to_num(overall[:, t - 1])) if weighted else np.ones(len(panel))
+        seeds = [[seed + origin * 100003 + i * len(PILLARS) + k for k in range(len(PILLARS))]
+                 for i in range(len(panel))]
+        forecast = {}
+        pillar_rows, score_rows = np.flatnonzero(shares > 0), np.flatnonzero(shares == 0)
+        if len(pillar_rows):
+            _, loadings, idiosyncratic, factor_mean, factor_paths = factor_forecast(train[pillar_rows], n_factors,
+                                                                                 h, n_draws)
+            tasks = [(str(i), idiosyncratic[j], weights[i], [None] * len(PILLARS), seeds[i], loadings[j])
+                     for j, i in enumerate(pillar_rows)]
+            fitted, _ = forecast_countries(tasks, h, n_draws, factor_mean=factor_mean, factor_paths=factor_paths,
+                                           quantiles=SCORE_QUANTILES)
+            # Anchor on the last score (no anchor while the score or a pillar is still unreported)
+            pillars_now = np.nan_to_num(train[pillar_rows, :, -1])
+            scores_now = overall[pillar_rows, t - 1]
+            scores_now = np.where(np.isnan(scores_now) | np.isnan(train[pillar_rows, :, -1]).any(axis=1),
+                                  shares[pillar_rows] * pillars_now.mean(axis=1), scores_now)
+            anchor_overall(fitted, scores_now, pillars_now, shares[pillar_rows])
+            for k, values in fitted.items():
+                forecast.setdefault(k, np.empty((len(panel),) + values.shape[1:]))[pillar_rows] = values
+        if len(score_rows):
+            tasks = [(str(i), overall[i, None, :t], weights[i], [None], seeds[i][:1], np.zeros((1, 0)))
+                     for i in score_rows]
+            fitted, _ = forecast_countries(tasks, h, n_draws, quantiles=SCORE_QUANTILES, mix=SCORE_MIX)
+            for k, values in score_only_forecasts(fitted).items():
+                forecast.setdefault(k, np.empty((len(panel),) + values.shape[1:]))[score_rows] = values
+        return forecast
+
+    started = time.perf_counter()
+    forecast = fit()
+    fit_seconds = time.perf_counter() - started
+
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        fit()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    scores = score_forecasts(forecast, metrics[..., t:t + h])
+    # Pad to the full horizon so origins add up element-wise
+    scores = {name: np.pad(values, ((0, 0), (0, horizon - h))) for name, values in scores.items()}
+    return {'variant': variant, 'origin': origin, 'h': h, 'fit_seconds': fit_seconds,
+            'peak_mb': peak, 'scores': scores}
+
+
+def summarize(results, variants):
+    """
+    Per-variant averages over origins/countries: overall, pillars, per metric
+    and per horizon (up to the longest horizon any origin could score)
+    """
+    summary = {}
+    for variant in variants:
+        runs = [r for r in results if r['variant'] == variant]
+        h = max(r['h'] for r in runs)
+        totals = {name: sum(r['scores'][name] for r in runs)[:, :h] for name in runs[0]['scores']}
+
+        def mean(rows, axis=None):
+            count = np.maximum(totals['n'][rows].sum(axis=axis), 1)
+            return {name: np.round(totals[name][rows].sum(axis=axis) / count, 4).tolist()
+                    for name in ('abs_error', 'crps', 'cover50', 'cover90')}
+
+        pillars = slice(0, len(PILLARS))
+        overall = slice(len(PILLARS), len(PILLARS) + 1)
+        peaks = [r['peak_mb'] for r in runs if r['peak_mb'] is not None]
+        summary[variant] = {
+            'origins': [r['origin'] for r in runs],
+            'fit_seconds': round(sum(r['fit_seconds'] for r in runs), 3),
+            'fit_seconds_per_origin': round(float(np.mean([r['fit_seconds'] for r in runs])), 3),
+            'peak_mb': round(max(peaks), 1) if peaks else None,
+            'overall': mean(overall),
+            'pillars': mean(pillars),
+            'overall_by_horizon': mean(overall, axis=0),
+            'by_metric': {metric: mean(slice(m, m + 1)) for m, metric in enumerate(METRICS)}
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the resilience forecasts")
+    parser.add_argument('--origins', type=parse_int_list,
+                        help="Forecast origins (last training year); default: every year with "
+                             f"at least {MIN_TRAIN_YEARS} training years and one year to score")
+    parser.add_argument('--horizon', type=int, default=5)
+    parser.add_argument('--variants', type=lambda v: [x for x in v.split(',') if x.strip()],
+                        default=list(VARIANTS))
+    parser.add_argument('--draws', type=int, default=DEFAULT_DRAWS)
+    parser.add_argument('--source', choices=['auto', 'cube', 'timeline'], default='auto',
+                        help="History to replay (auto: indicator cube if present, else the timeline JSON)")
+    parser.add_argument('--workers', type=int, default=1, help="Parallel origins (0 = all cores)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Skip the traced pass that measures peak memory at the latest origin")
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    unknown = [v for v in args.variants if v not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variants {unknown}; choose from {list(VARIANTS)}")
+
+    try:
+        source, labels, years, panel, overall, shares = load_panel(args.source)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    origins = args.origins or years[MIN_TRAIN_YEARS - 1:-1]
+    invalid = [o for o in origins if o not in years[:-1]]
+    if invalid:
+        parser.error(f"origins {invalid} outside {years[0]}-{years[-2]}")
+    print(f"✓ Panel ({source}): {len(labels)} countries x {len(PILLARS)} pillars, {years[0]}-{years[-1]}")
+    print(f"✓ Origins {origins}, horizon {args.horizon}, variants {args.variants}")
+
+    # Peak memory is traced once per variant, at the origin with the longest training window
+    jobs = [(variant, origin, not args.no_memory and origin == max(origins))
+            for variant in args.variants for origin in origins]
+    workers = args.workers or os.cpu_count() or 1
+    variants, job_origins, trace = (list(v) for v in zip(*jobs))
+    run = [variants, job_origins, repeat(years), repeat(panel), repeat(overall), repeat(shares),
+           repeat(args.horizon), repeat(args.draws), repeat(args.seed), trace]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_origin, *run))
+    else:
+        results = list(map(run_origin, *run))
+
+    summary = summarize(results, args.variants)
+    print(f"\n{'Variant':22s} {'MAE':>7s} {'CRPS':>7s} {'Cov50':>6s} {'Cov90':>6s} {'Fit s':>8s} {'Peak MB':>8s}")
+    for variant, s in summary.items():
+        o = s['overall']
+        peak = f"{s['peak_mb']:8.1f}" if s['peak_mb'] is not None else f"{'-':>8s}"
+        print(f"{variant:22s} {o['abs_error']:7.4f} {o['crps']:7.4f} {o['cover50']:6.2f} {o['cover90']:6.2f} "
+              f"{s['fit_seconds_per_origin']:8.2f} {peak}")
+    print("(overall score; untraced fit time per origin, peak traced memory at the latest origin)")
+
+    output = {
+        'source': source,
+        'years': years,
+        'origins': origins,
+        'horizon': args.horizon,
+        'draws': args.draws,
+        'countries': len(labels),
+        'variants': summary
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\n✓ Saved backtest results to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the World Bank fetch + scoring path fully offline
+- Starts the worldbank_standin.py server in-process
+- Times an end-to-end refresh (fetch, indicator cube, scoring) for every
+  concurrency / batch size combination
+- Runs in a scratch directory so real caches and outputs are untouched
+
+Usage:
+    python benchmark_fetch.py [--concurrency 1,2,4,8] [--batch-size 1,8]
+                              [--latency 0.2] [--error-rate 0.0] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+import fetch_live_data
+from country_registry import fetch_registry
+from worldbank_standin import StandinState, start_in_thread, load_recorded_series, synthetic_series
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def timed_refresh(concurrency, batch_size, rate, page_size, registry):
+    """One full refresh against the configured API root; returns (seconds, countries scored)"""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        all_data, _ = fetch_live_data.fetch_all_indicators(concurrency, rate, cache=None,
+                                                           batch_size=batch_size, page_size=page_size)
+        cube = fetch_live_data.build_indicator_cube(all_data)
+        country_dataset = fetch_live_data.build_country_dataset(cube, registry)
+    return time.perf_counter() - started, len(country_dataset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetch_live_data.py against a local World Bank stand-in")
+    parser.add_argument('--concurrency', type=parse_int_list, default=[1, 2, 4, 8])
+    parser.add_argument('--batch-size', type=parse_int_list, default=[1, fetch_live_data.DEFAULT_BATCH_SIZE])
+    parser.add_argument('--page-size', type=int, default=fetch_live_data.DEFAULT_PAGE_SIZE)
+    parser.add_argument('--rate', type=float, default=100.0, help="Token bucket rate (req/s) used by the fetcher")
+    parser.add_argument('--latency', type=float, default=0.2, help="Stand-in response latency (seconds)")
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--max-per-page', type=int, help="Stand-in cap on per_page (forces pagination)")
+    parser.add_argument('--synthetic', type=int, metavar='N_COUNTRIES',
+                        help="Use synthetic data instead of recorded payloads")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    recorded = synthetic_series(args.synthetic) if args.synthetic else load_recorded_series()
+    source = f"synthetic ({args.synthetic} countries)" if args.synthetic else "recorded payloads"
+    if not recorded:
+        recorded = synthetic_series()
+        source = "synthetic (no recorded payloads found)"
+
+    state = StandinState(recorded, args.latency, args.jitter, args.error_rate, args.max_per_page)
+    server, base_url = start_in_thread(state)
+    fetch_live_data.BASE_URL_WB = base_url
+    registry = fetch_registry(base_url)  # Once, outside the timed runs
+
+    print("=" * 80)
+    print("WORLD BANK FETCH BENCHMARK")
+    print("=" * 80)
+    print(f"\nStand-in: {base_url} serving {source}")
+    print(f"Latency {args.latency}s ± {args.jitter}s, error rate {args.error_rate:.0%}, "
+          f"{args.repeat} runs per setting\n")
+    print(f"{'batch':>5s} {'workers':>7s} {'median s':>9s} {'min s':>7s} {'requests':>9s} {'errors':>7s} {'countries':>9s}")
+
+    original_dir = os.getcwd()
+    results = []
+    try:
+        for batch_size in args.batch_size:
+            for concurrency in args.concurrency:
+                timings, before = [], (state.requests, state.errors)
+                for _ in range(args.repeat):
+                    with tempfile.TemporaryDirectory() as scratch:
+                        os.chdir(scratch)
+                        elapsed, countries = timed_refresh(concurrency, batch_size, args.rate, args.page_size,
+                                                                 registry)
+                        os.chdir(original_dir)
+                    timings.append(elapsed)
+                requests_made = (state.requests - before[0]) / args.repeat
+                errors = (state.errors - before[1]) / args.repeat
+                median = statistics.median(timings)
+                results.append((batch_size, concurrency, median))
+                print(f"{batch_size:5d} {concurrency:7d} {median:9.2f} {min(timings):7.2f} "
+                      f"{requests_made:9.1f} {errors:7.1f} {countries:9d}")
+    finally:
+        os.chdir(original_dir)
+        server.shutdown()
+
+    baseline = next((r[2] for r in results if r[0] == 1 and r[1] == 1), results[0][2])
+    best = min(results, key=lambda r: r[2])
+    print(f"\n🏁 Fastest: batch {best[0]}, {best[1]} workers - {best[2]:.2f}s "
+          f"({baseline / best[2]:.1f}x vs batch 1 / 1 worker)")
+
+
+if __name__ == '__main__':
+    main()
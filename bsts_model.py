@@ -0,0 +1,362 @@
+"""
+Batched structural time series engine for resilience forecasting
+- Local level + trend states for a whole panel held as NumPy arrays
+- Any leading batch shape (countries, countries x metrics, ...); time is the last axis
+- Series are right-aligned on the latest year; NaN marks a missing observation
+- Variances estimated per series by maximum likelihood, warm-started from
+  the optimizer state saved by the previous run; tolerances are tight enough
+  that warm and cold starts reach the same optimum, so results do not depend
+  on the saved state
+- Forecast bands from simulated state trajectories, drawn in memory-bounded
+  chunks with one random stream per series; trajectories can be combined
+  across the last batch axis (e.g. pillars -> overall score) before taking
+  quantiles, and shared common-factor paths can be added through loadings
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+from scipy.optimize import minimize
+
+PARAMS_FILE = os.path.join('cache', 'bsts_params.json')
+# Bump whenever a change alters the forecasts produced for the same inputs
+MODEL_VERSION = 6
+
+# Level, trend and observation variances (the previous hard-coded sigmas, squared)
+DEFAULT_VARIANCES = np.array([0.01, 0.001, 0.05]) ** 2
+LOG_VARIANCE_BOUNDS = (np.log(1e-8), np.log(1e-1))
+# Weak log-normal prior around DEFAULT_VARIANCES keeps short series well-posed
+PRIOR_SD = 2.0
+# Prior variance of the initial trend (effectively diffuse on a 0-1 score scale)
+DIFFUSE_TREND = 1.0
+# L-BFGS-B stopping rule: warm- and cold-started fits agree to ~1e-6 in log-variance
+OPTIMIZER_OPTIONS = {'ftol': 1e-12, 'gtol': 1e-6, 'maxiter': 500}
+GRADIENT_STEP = 1e-5
+
+# Forecast quantiles reported per horizon ('p5' ... 'p95')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+DEFAULT_DRAWS = 2000
+# Upper bound on simulated normals held at once (~16 MB of float64)
+MAX_SIMULATION_VALUES = 2_000_000
+
+
+def hyperparameters():
+    """Fixed model settings that, with MODEL_VERSION, determine the forecasts"""
+    return {
+        'default_variances': DEFAULT_VARIANCES.tolist(),
+        'log_variance_bounds': list(LOG_VARIANCE_BOUNDS),
+        'prior_sd': PRIOR_SD,
+        'diffuse_trend': DIFFUSE_TREND,
+        'optimizer': OPTIMIZER_OPTIONS,
+        'gradient_step': GRADIENT_STEP
+    }
+
+
+def align_series(series_list):
+    """
+    Stack ragged series (1-D, or [..., T] blocks such as pillars x years) into
+    a [n_series, ..., T] array, right-aligned so the last column is the most
+    recent observation (missing leading years = NaN)
+    """
+    series_list = [np.asarray(s, dtype=np.float64) for s in series_list]
+    width = max((s.shape[-1] for s in series_list), default=0)
+    lead = series_list[0].shape[:-1] if series_list else ()
+    panel = np.full((len(series_list),) + lead + (width,), np.nan)
+    for i, series in enumerate(series_list):
+        if series.shape[-1]:
+            panel[i, ..., width - series.shape[-1]:] = series
+    return panel
+
+
+def kalman_filter(y, variances, weights=None):
+    """
+    Local linear trend Kalman filter over every series at once.
+
+    y is [..., T], variances [..., 3] (level, trend, observation) and weights
+    (broadcastable to y) scale the Kalman gain. The state starts at the first
+    observation with a diffuse trend; missing observations only predict.
+    Returns (levels [..., T], trends [..., T], covariance (P11, P12, P22) of
+    the final state, log-likelihood [...]). The log-likelihood is that of the
+    unweighted model and skips the two observations spent on initialization.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    variances = np.asarray(variances, dtype=np.float64)
+    q_level, q_trend, h_obs = (variances[..., k] for k in range(3))
+    weights = np.ones_like(y) if weights is None else np.broadcast_to(weights, y.shape)
+    batch = np.broadcast_shapes(y.shape[:-1], variances.shape[:-1])
+
+    observed = ~np.isnan(y)
+    first = np.argmax(observed, axis=-1)
+    start = np.take_along_axis(y, first[..., None], axis=-1)[..., 0]
+    level = np.broadcast_to(np.where(observed.any(axis=-1), start, 0.5), batch).copy()
+    trend = np.zeros(batch)
+    p11 = np.broadcast_to(h_obs, batch).copy()
+    p12 = np.zeros(batch)
+    p22 = np.full(batch, DIFFUSE_TREND)
+    seen = np.zeros(batch, dtype=int)
+    loglik = np.zeros(batch)
+
+    levels = np.empty(batch + y.shape[-1:])
+    trends = np.empty(batch + y.shape[-1:])
+    for t in range(y.shape[-1]):
+        active = t > first
+        seen = seen + (observed[..., t] & (t >= first))
+
+        # Predict: level += trend, covariance through T = [[1, 1], [0, 1]] plus Q
+        pred_level = level + trend
+        pred11 = p11 + 2 * p12 + p22 + q_level
+        pred12 = p12 + p22
+        pred22 = p22 + q_trend
+
+        # Update with the observation (weighted gain, Joseph-form covariance).
+        # A zero innovation variance means the state is already pinned down
+        # exactly (e.g. a pillar without data, held fixed with zero variances):
+        # the observation adds nothing, and dividing by f would give 0/0 = NaN
+        # gains that turn every later level NaN
+        f = pred11 + h_obs
+        has_obs = active & observed[..., t] & (f > 0)
+        f = np.where(has_obs, f, 1.0)
+        innovation = np.where(has_obs, y[..., t] - pred_level, 0.0)
+        k1 = np.where(has_obs, pred11 / f, 0.0)
+        k2 = np.where(has_obs, pred12 / f, 0.0)
+        w = np.where(has_obs, weights[..., t], 0.0)
+        loglik = loglik + np.where(has_obs & (seen > 2),
+                                   -0.5 * (np.log(2 * np.pi * f) + innovation ** 2 / f), 0.0)
+        k1, k2 = w * k1, w * k2
+
+        new11 = (1 - k1) ** 2 * pred11 + k1 ** 2 * h_obs
+        new12 = (1 - k1) * (pred12 - k2 * pred11) + k1 * k2 * h_obs
+        new22 = pred22 - 2 * k2 * pred12 + k2 ** 2 * (pred11 + h_obs)
+
+        level = np.where(active, pred_level + k1 * innovation, level)
+        trend = np.where(active, trend + k2 * innovation, trend)
+        p11 = np.where(active, new11, p11)
+        p12 = np.where(active, new12, p12)
+        p22 = np.where(active, new22, p22)
+        levels[..., t] = level
+        trends[..., t] = trend
+
+    return levels, trends, (p11, p12, p22), loglik
+
+
+def penalized_loglik(y, log_variances):
+    """Kalman log-likelihood plus the weak prior on the log-variances"""
+    log_variances = np.asarray(log_variances, dtype=np.float64)
+    _, _, _, loglik = kalman_filter(y, np.exp(log_variances))
+    prior = -0.5 * (((log_variances - np.log(DEFAULT_VARIANCES)) / PRIOR_SD) ** 2).sum(axis=-1)
+    return loglik + prior
+
+
+def estimate_variances(y, start=None, step=GRADIENT_STEP):
+    """
+    Maximum-likelihood log-variances for every series in y [..., T].
+
+    Each series is optimized on its own (L-BFGS-B), starting from `start`
+    ([..., 3] log-variances, e.g. the previous optimum) or the defaults. The
+    objective and its central-difference gradient come from one batched filter
+    call per step. The start only changes how many iterations a fit takes:
+    OPTIMIZER_OPTIONS are tight enough that every start reaches the same
+    optimum well within the forecasts' rounding.
+    Returns (log_variances [..., 3], optimizer state per series).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    flat = y.reshape(-1, y.shape[-1])
+    if start is None:
+        start = np.log(DEFAULT_VARIANCES)
+    start = np.broadcast_to(start, y.shape[:-1] + (3,)).reshape(-1, 3)
+    probes = np.vstack([np.zeros(3), step * np.eye(3), -step * np.eye(3)])
+
+    estimates = np.array(start, dtype=np.float64)
+    states = []
+    for i, series in enumerate(flat):
+        if np.count_nonzero(~np.isnan(series)) < 3:
+            # Too short to say anything beyond the prior
+            states.append({'log_variances': estimates[i].tolist(), 'loglik': 0.0, 'iterations': 0,
+                           'converged': False})
+            continue
+
+        def objective(theta):
+            values = penalized_loglik(series, theta + probes)
+            return -values[0], -(values[1:4] - values[4:]) / (2 * step)
+
+        result = minimize(objective, np.clip(start[i], *LOG_VARIANCE_BOUNDS), jac=True,
+                          method='L-BFGS-B', bounds=[LOG_VARIANCE_BOUNDS] * 3, options=OPTIMIZER_OPTIONS)
+        estimates[i] = result.x
+        states.append({'log_variances': result.x.tolist(), 'loglik': float(-result.fun),
+                       'iterations': int(result.nit), 'converged': bool(result.success)})
+    return estimates.reshape(y.shape[:-1] + (3,)), states
+
+
+def quantile_name(q):
+    return f"p{round(q * 100):g}"
+
+
+def simulate_paths(level, trend, state_cov, variances, h, n_draws, seeds):
+    """
+    Simulated observation paths [n, draws, h] for n series (flat arrays).
+
+    The final state is drawn from N((level, trend), P), then level/trend/
+    observation noise is added for every horizon step at once. Each series
+    uses its own Generator seeded from `seeds`, so draws do not depend on
+    which other series share the batch.
+    """
+    p11, p12, p22 = state_cov
+    q_level, q_trend, h_obs = (np.sqrt(variances[:, k])[:, None, None] for k in range(3))
+    noise = np.stack([np.random.default_rng(seed).standard_normal((n_draws, 2 + 3 * h)) for seed in seeds])
+
+    # Cholesky factor of the 2x2 state covariance
+    l11 = np.sqrt(np.maximum(p11, 0))
+    l21 = np.divide(p12, l11, out=np.zeros_like(p12), where=l11 > 0)
+    l22 = np.sqrt(np.maximum(p22 - l21 ** 2, 0))
+    level0 = level[:, None] + l11[:, None] * noise[:, :, 0]
+    trend0 = trend[:, None] + l21[:, None] * noise[:, :, 0] + l22[:, None] * noise[:, :, 1]
+
+    eta, zeta, eps = (noise[:, :, 2 + k * h:2 + (k + 1) * h] for k in range(3))
+    # trend_k = trend_0 + sum(zeta_1..k); level_k = level_0 + sum(trend_0..k-1) + sum(eta_1..k)
+    trends = trend0[:, :, None] + np.cumsum(q_trend * zeta, axis=-1)
+    drift = np.cumsum(np.concatenate([trend0[:, :, None], trends[:, :, :-1]], axis=-1), axis=-1)
+    levels = level0[:, :, None] + drift + np.cumsum(q_level * eta, axis=-1)
+    return levels + h_obs * eps
+
+
+def forecast_quantiles(level, trend, state_cov, variances, h, n_draws=DEFAULT_DRAWS, seeds=None,
+                       quantiles=QUANTILES, mix=None, common=None):
+    """
+    {'p5': [..., h], ...} forecast quantiles for every series from n_draws
+    simulated trajectories. Series are simulated in chunks sized so at most
+    MAX_SIMULATION_VALUES normals are alive at once; chunks run along the
+    series axis, so every quantile is computed over all of a series' draws.
+
+    With `mix` ([outputs, P] for a batch whose last axis has P series), each
+    draw's trajectories are combined across that axis first, so the outputs
+    are quantiles of e.g. the pillar average path by path, shaped [..., outputs, h].
+
+    `common` = (loadings [..., k], factor paths [k, draws, h]) adds the shared
+    common-factor draws to every series' trajectories before mixing.
+    """
+    if mix is None:
+        level, trend, variances = level[..., None], trend[..., None], variances[..., None, :]
+        state_cov = [c[..., None] for c in state_cov]
+        seeds = None if seeds is None else np.asarray(seeds)[..., None]
+        if common is not None:
+            common = (common[0][..., None, :], common[1])
+        bands = forecast_quantiles(level, trend, state_cov, variances, h, n_draws, seeds, quantiles,
+                                   np.eye(1), common)
+        return {name: values[..., 0, :] for name, values in bands.items()}
+
+    batch = level.shape
+    n, p = int(np.prod(batch[:-1])), batch[-1]
+    level, trend = level.reshape(n, p), trend.reshape(n, p)
+    state_cov = [c.reshape(n, p) for c in state_cov]
+    variances = variances.reshape(n, p, 3)
+    seeds = (np.arange(n * p) if seeds is None else np.broadcast_to(seeds, batch)).reshape(n, p)
+    if common is not None:
+        loadings, factor_paths = common
+        loadings = np.broadcast_to(loadings, batch + factor_paths.shape[:1]).reshape(n, p, -1)
+
+    out = {quantile_name(q): np.empty((n, len(mix), h)) for q in quantiles}
+    chunk = max(1, MAX_SIMULATION_VALUES // (n_draws * (2 + 3 * h) * p))
+    for i in range(0, n, chunk):
+        part = slice(i, i + chunk)
+        rows = len(level[part])
+        paths = simulate_paths(level[part].reshape(-1), trend[part].reshape(-1),
+                               [c[part].reshape(-1) for c in state_cov], variances[part].reshape(-1, 3),
+                               h, n_draws, seeds[part].reshape(-1))
+        paths = paths.reshape(rows, p, n_draws, h)
+        if common is not None:
+            paths = paths + np.einsum('rpk,kdh->rpdh', loadings[part], factor_paths)
+        combined = np.einsum('op,rpdh->rodh', mix, paths)
+        for q, values in zip(quantiles, np.quantile(combined, quantiles, axis=2)):
+            out[quantile_name(q)][part] = values
+    return {name: values.reshape(batch[:-1] + (len(mix), h)) for name, values in out.items()}
+
+
+def load_params(path=PARAMS_FILE):
+    """Saved optimizer state {series key: {...}}; empty on first run"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)['series']
+
+
+def save_params(params, path=PARAMS_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    state = {'saved_at': datetime.now().isoformat(timespec='seconds'), 'series': params}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+class BSTSModel:
+    """
+    Simplified Bayesian Structural Time Series Model
+    Components: Level and Trend, advanced for every series per time step
+    """
+
+    def __init__(self, y, weights=None, log_variances=None, fixed=None):
+        self.y = np.asarray(y, dtype=np.float64)
+        self.n = self.y.shape[-1]
+        self.weights = (np.ones_like(self.y) if weights is None
+                        else np.broadcast_to(np.asarray(weights, dtype=np.float64), self.y.shape))
+        # Series held at their filtered state without uncertainty (e.g. pillars without data)
+        self.fixed = np.broadcast_to(np.zeros((), dtype=bool) if fixed is None else fixed, self.y.shape[:-1])
+
+        # Hyperparameters (estimated via MLE); defaults until estimate() runs
+        start = np.log(DEFAULT_VARIANCES) if log_variances is None else log_variances
+        self.set_log_variances(np.broadcast_to(start, self.y.shape[:-1] + (3,)))
+        self.optimizer_state = None
+
+    def set_log_variances(self, log_variances):
+        self.log_variances = np.array(log_variances, dtype=np.float64)
+        self.sigma_level, self.sigma_trend, self.sigma_obs = np.sqrt(np.exp(np.moveaxis(self.log_variances, -1, 0)))
+
+    def estimate(self):
+        """MLE of the level/trend/observation variances, warm-started from the current values"""
+        fixed = self.fixed.reshape(-1)
+        log_variances = self.log_variances.reshape(-1, 3).copy()
+        estimated, states = estimate_variances(self.y.reshape(-1, self.n)[~fixed], start=log_variances[~fixed])
+        log_variances[~fixed] = estimated
+        states = iter(states)
+        self.optimizer_state = [{'log_variances': lv.tolist(), 'loglik': 0.0, 'iterations': 0, 'converged': False}
+                                if f else next(states) for lv, f in zip(log_variances, fixed)]
+        self.set_log_variances(log_variances.reshape(self.log_variances.shape))
+        return self
+
+    def fit(self):
+        """Fit BSTS model using weighted Kalman filter (all series at once)"""
+        # Simple state space model: y_t = level_t + trend_t + noise
+        variances = np.where(self.fixed[..., None], 0.0, np.exp(self.log_variances))
+        self.levels, self.trends, _, _ = kalman_filter(self.y, variances, self.weights)
+        # State uncertainty from the unweighted filter: the zero-percentile
+        # weights steer the estimate, not how much the data pins it down
+        _, _, state_cov, self.loglik = kalman_filter(self.y, variances)
+        self.state_cov = tuple(np.where(self.fixed, 0.0, c) for c in state_cov)
+        return self
+
+    def forecast(self, h=5, n_draws=DEFAULT_DRAWS, seeds=None, mix=None, common=None, quantiles=QUANTILES):
+        """
+        Forecast h steps ahead for every series.
+        Returns {'mean', 'p5', 'p25', 'p50', 'p75', 'p95'} arrays shaped [..., h]
+        (or one 'pNN' per entry of `quantiles`); the quantiles come from
+        n_draws simulated trajectories per series.
+        `mix` ([outputs, P]) maps the last batch axis to combined outputs
+        ([..., outputs, h]), applied to the mean and to every trajectory.
+        `common` = (loadings [..., k], factor mean [k, h], factor paths
+        [k, draws, h]) adds a forecast common-factor component to every series.
+        """
+        steps = np.arange(1, h + 1)
+        forecast = self.levels[..., -1:] + self.trends[..., -1:] * steps
+        if common is not None:
+            forecast = forecast + np.einsum('...k,kh->...h', common[0], common[1])
+        if mix is not None:
+            forecast = np.einsum('op,...ph->...oh', mix, forecast)
+
+        # Add uncertainty (simulated forecast distribution)
+        variances = np.where(self.fixed[..., None], 0.0, np.exp(self.log_variances))
+        bands = forecast_quantiles(self.levels[..., -1], self.trends[..., -1], self.state_cov,
+                                   variances, h, n_draws, seeds, quantiles, mix,
+                                   None if common is None else (common[0], common[2]))
+        return {'mean': forecast, **bands}
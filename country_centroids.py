@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+ISO3 -> (lat, lon) label points precomputed from world.geojson
+- Area-weighted centroid of every polygon of a (Multi)Polygon, holes
+  subtracted, so a country's point sits in its main landmass instead of at
+  the mean of its first ring's vertices
+- Countries split by the antimeridian (Fiji, Russia) are averaged on a
+  0-360 longitude axis
+- Built once into cache/country_centroids.json and rebuilt only when
+  world.geojson changes; scripts look countries up by ISO3 in O(1)
+
+Usage:
+    python country_centroids.py [--geojson world.geojson] [--rebuild]
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+from country_resolver import sources_digest
+
+GEOJSON_FILE = 'world.geojson'
+CENTROIDS_FILE = os.path.join('cache', 'country_centroids.json')
+ISO3_PROPERTY = 'ISO3166-1-Alpha-3'
+ISO3_PATTERN = re.compile(r'[A-Z]{3}')
+
+
+def ring_moments(ring):
+    """(area, area * lon, area * lat) of a ring by the shoelace formula, area unsigned"""
+    points = np.asarray(ring, dtype=np.float64)[:, :2]
+    if len(points) < 3:
+        return 0.0, 0.0, 0.0
+    x, y = points[:, 0], points[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)  # closing edge is zero-length when the ring is closed
+    cross = x * y1 - x1 * y
+    signed = cross.sum() / 2
+    sign = 1.0 if signed >= 0 else -1.0
+    return abs(signed), sign * ((x + x1) * cross).sum() / 6, sign * ((y + y1) * cross).sum() / 6
+
+
+def geometry_polygons(geometry):
+    """List of polygons (each a list of rings) of a Polygon or MultiPolygon"""
+    if not geometry:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def geometry_centroid(geometry):
+    """
+    (lat, lon) area-weighted centroid over all polygons of a geometry, or
+    None without any polygon. Degenerate (zero-area) shapes fall back to
+    the mean of their vertices.
+    """
+    parts = []  # (area, lon, lat) per polygon
+    for rings in geometry_polygons(geometry):
+        if not rings:
+            continue
+        area, mx, my = ring_moments(rings[0])
+        for hole in rings[1:]:
+            hole_area, hx, hy = ring_moments(hole)
+            area, mx, my = area - hole_area, mx - hx, my - hy
+        if area > 0:
+            parts.append((area, mx / area, my / area))
+        else:
+            vertices = np.asarray(rings[0], dtype=np.float64)[:, :2]
+            if len(vertices) > 1 and (vertices[0] == vertices[-1]).all():
+                vertices = vertices[:-1]
+            parts.append((0.0, *vertices.mean(axis=0)))
+    if not parts:
+        return None
+
+    area, lon, lat = (np.array(v) for v in zip(*parts))
+    if lon.max() - lon.min() > 180:
+        lon = np.where(lon < 0, lon + 360, lon)
+    weights = area if area.sum() > 0 else np.ones_like(area)
+    lon = (np.average(lon, weights=weights) + 180) % 360 - 180
+    return float(np.average(lat, weights=weights)), float(lon)
+
+
+def build_centroids(geojson):
+    """{ISO3: [lat, lon]} for every feature with a valid ISO3 code (first feature wins)"""
+    centroids = {}
+    for feature in geojson.get('features', []):
+        iso3 = str((feature.get('properties') or {}).get(ISO3_PROPERTY) or '').strip().upper()
+        if not ISO3_PATTERN.fullmatch(iso3) or iso3 in centroids:
+            continue
+        point = geometry_centroid(feature.get('geometry'))
+        if point:
+            centroids[iso3] = [round(point[0], 4), round(point[1], 4)]
+    return centroids
+
+
+def load_centroids(path=CENTROIDS_FILE, geojson_file=GEOJSON_FILE, rebuild=False):
+    """
+    The persisted centroid table, rebuilt (and saved) when world.geojson
+    changed. Without world.geojson, the last saved table (or {}) is returned.
+    """
+    cached = None
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    if not os.path.exists(geojson_file):
+        return cached['centroids'] if cached else {}
+
+    digest = sources_digest([geojson_file])
+    if not rebuild and cached and cached.get('sources') == digest:
+        return cached['centroids']
+
+    with open(geojson_file, 'r', encoding='utf-8') as f:
+        centroids = build_centroids(json.load(f))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'built_at': datetime.now().isoformat(timespec='seconds'), 'sources': digest,
+                   'centroids': centroids}, f)
+    os.replace(tmp_path, path)
+    return centroids
+
+
+def fill_coordinates(records, centroids, resolve=None):
+    """
+    Set lat/lon on records that have none from the centroid table. With
+    `resolve`, the ISO3 it returns for the record's name decides (record
+    codes can be pseudo-codes shared by several countries, e.g. AUS on
+    Austria); the record's own ISO3 is used when there is no resolver or
+    the name does not resolve. Returns the number of records filled.
+    """
+    filled = 0
+    for record in records:
+        if record.get('lat') and record.get('lon'):
+            continue
+        iso3 = resolve(record['name']) if resolve and record.get('name') else None
+        point = centroids.get(iso3 or str(record.get('iso3') or '').strip().upper())
+        if point:
+            record['lat'], record['lon'] = point
+            filled += 1
+    return filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute country centroids from world.geojson")
+    parser.add_argument('--geojson', default=GEOJSON_FILE)
+    parser.add_argument('--output', default=CENTROIDS_FILE)
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if world.geojson is unchanged")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.geojson):
+        parser.error(f"{args.geojson} not found")
+    centroids = load_centroids(args.output, args.geojson, rebuild=args.rebuild)
+    print(f"✓ {len(centroids)} country centroids in {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Merge layer for combining country records from several sources
+- CountryIndex keeps ISO3 and normalized-name hash indexes over a record list,
+  so matching a source row is O(1) instead of a scan of the merged list
+- missing_records adds the countries one source lacks with a set difference
+- Every merge step stays linear in the number of records, whatever the
+  number of sources (World Bank, INFORM, ND-GAIN, WGI, IMF, ...)
+"""
+
+import re
+import unicodedata
+
+
+def normalize_name(name):
+    """
+    Comparable form of a country name: accents stripped, lower case,
+    punctuation to spaces, a leading 'the' dropped ("Côte d'Ivoire" -> "cote d ivoire")
+    """
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    text = re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+    return re.sub(r'^the ', '', text)
+
+
+class CountryIndex:
+    """
+    Records plus by-ISO3, by-exact-name and by-normalized-name lookups. The
+    first record seen for a code or name wins; an exact (case-insensitive)
+    name match beats a normalized one, so "Cote d'Ivoire" and "Côte d'Ivoire"
+    records stay distinguishable.
+    """
+
+    def __init__(self, records=()):
+        self.records = []
+        self.by_iso3 = {}
+        self.by_exact = {}
+        self.by_name = {}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        self.records.append(record)
+        iso3 = (record.get('iso3') or '').strip().upper()
+        if iso3:
+            self.by_iso3.setdefault(iso3, record)
+        name = str(record.get('name', '')).strip()
+        if name:
+            self.by_exact.setdefault(name.lower(), record)
+            self.by_name.setdefault(normalize_name(name), record)
+        return record
+
+    def __contains__(self, iso3):
+        return str(iso3).strip().upper() in self.by_iso3
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, iso3):
+        """Record for an ISO3 code, or None"""
+        return self.by_iso3.get(str(iso3).strip().upper())
+
+    def find_name(self, name):
+        """Record with the same name (exact, then normalized), or None"""
+        return self.by_exact.get(str(name).strip().lower()) or self.by_name.get(normalize_name(name))
+
+    def match(self, iso3=None, name=None):
+        """
+        Record for a source row: the name's record when its code agrees
+        with iso3, else the code's record, else the name's record. A name
+        match can then carry a missing or wrong code (e.g. 'AUS' on
+        Austria), so callers write the resolved iso3 onto their copy.
+        """
+        by_code = self.get(iso3) if iso3 else None
+        by_name = self.find_name(name) if name else None
+        if by_name is not None and (by_code is None
+                                    or (by_name.get('iso3') or '').strip().upper() == str(iso3).strip().upper()):
+            return by_name
+        return by_code
+
+    def codes(self):
+        return set(self.by_iso3)
+
+
+def missing_records(records, present_codes):
+    """
+    Records whose ISO3 is not in present_codes (set difference, order kept);
+    each missing code is added once, even if `records` repeats it
+    """
+    present = {str(code).strip().upper() for code in present_codes}
+    missing = []
+    for record in records:
+        code = (record.get('iso3') or '').strip().upper()
+        if code not in present:
+            present.add(code)
+            missing.append(record)
+    return missing
@@ -0,0 +1,95 @@
+"""
+Country registry built once from the World Bank country metadata endpoint
+- ISO3 -> name, region, income level, aggregate flag and coordinates
+- Cached as cache/country_registry.json; every script loads it instead of
+  re-deriving names/regions or hard-coding aggregate lists
+"""
+
+import json
+import os
+from datetime import datetime
+
+import requests
+
+REGISTRY_FILE = os.path.join('cache', 'country_registry.json')
+WB_PUBLIC_API = "https://api.worldbank.org/v2"
+
+
+def parse_country(item):
+    """Registry entry from one World Bank /country record"""
+    region = item.get('region') or {}
+    income = item.get('incomeLevel') or {}
+
+    def coordinate(key):
+        try:
+            return float(item.get(key))
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        'iso3': item['id'],
+        'iso2': item.get('iso2Code', ''),
+        'name': item.get('name', item['id']),
+        'region': region.get('value', ''),
+        'income': income.get('value', ''),
+        'aggregate': region.get('value', '').strip() == 'Aggregates',
+        'capital': item.get('capitalCity', ''),
+        # The World Bank publishes capital-city coordinates
+        'lat': coordinate('latitude'),
+        'lon': coordinate('longitude')
+    }
+
+
+def fetch_registry(base_url=WB_PUBLIC_API, session=None, per_page=500):
+    """Download every country/aggregate record, following pagination"""
+    http = session or requests
+    countries = {}
+    page, pages = 1, 1
+    while page <= pages:
+        response = http.get(f"{base_url}/country",
+                            params={'format': 'json', 'per_page': per_page, 'page': page}, timeout=30)
+        response.raise_for_status()
+        meta, items = response.json()
+        pages = int(meta.get('pages') or 1)
+        for item in items or []:
+            entry = parse_country(item)
+            countries[entry['iso3']] = entry
+        page += 1
+    return countries
+
+
+def save_registry(countries, path=REGISTRY_FILE):
+    registry = {
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'countries': countries
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_registry(path=REGISTRY_FILE, base_url=WB_PUBLIC_API, refresh=False, offline=False):
+    """
+    {iso3: entry} from the cached registry, building it from the API the first
+    time (or when refresh=True). Returns {} if it can be neither read nor built.
+    """
+    if not refresh and os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)['countries']
+    if offline:
+        return {}
+    try:
+        countries = fetch_registry(base_url)
+    except Exception as e:
+        print(f"⚠️  Could not build country registry: {e}")
+        return {}
+    save_registry(countries, path)
+    print(f"✓ Built country registry: {len(countries)} entries -> {path}")
+    return countries
+
+
+def country_codes(registry):
+    """ISO3 codes of real economies (aggregates excluded) for set lookups"""
+    return frozenset(iso3 for iso3, entry in registry.items() if not entry['aggregate'])
@@ -0,0 +1,147 @@
+"""
+Country name -> ISO3 resolver shared by the merge scripts
+- Alias table: curated names/variants (country_aliases.json), then the World
+  Bank country registry, then names seen in resilience_data_live.json
+- Exact lookups on normalized names; a character trigram index catches
+  spelling variants ("Bosnia & Herzegovina", "Cote dIvoire")
+- Built once and saved to cache/country_resolver.json; rebuilt only when
+  one of its sources changes
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime
+
+from country_merge import normalize_name
+from country_registry import REGISTRY_FILE, load_registry
+
+ALIAS_FILE = 'country_aliases.json'
+RECORDS_FILE = 'resilience_data_live.json'
+RESOLVER_FILE = os.path.join('cache', 'country_resolver.json')
+
+FUZZY_THRESHOLD = 0.8  # Dice similarity of trigram sets
+ISO3_PATTERN = re.compile(r'[A-Z]{3}')
+
+
+def trigrams(name):
+    """Character trigrams of a normalized name, padded so word edges count"""
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_aliases(curated, registry=None, records=()):
+    """
+    {normalized name: ISO3}. Earlier sources win: curated aliases, then the
+    registry, then data records; ISO3 codes resolve to themselves. Records
+    only contribute well-formed codes, never names already claimed.
+    """
+    aliases = {}
+
+    def add(name, iso3):
+        key = normalize_name(name)
+        if key and ISO3_PATTERN.fullmatch(iso3 or ''):
+            aliases.setdefault(key, iso3)
+
+    for iso3, names in curated.items():
+        add(iso3, iso3)
+        for name in names:
+            add(name, iso3)
+    for iso3, entry in (registry or {}).items():
+        add(iso3, iso3)
+        add(entry.get('name'), iso3)
+    for record in records:
+        add(record.get('name'), record.get('iso3'))
+    return aliases
+
+
+class CountryResolver:
+    """
+    aliases: {normalized name: ISO3}; index: {trigram: [alias ids]} so fuzzy
+    lookups only score names sharing a trigram with the query
+    """
+
+    def __init__(self, aliases, index=None):
+        self.aliases = dict(aliases)
+        self.names = list(self.aliases)
+        self.sizes = [len(trigrams(name)) for name in self.names]
+        if index is None:
+            index = {}
+            for i, name in enumerate(self.names):
+                for gram in trigrams(name):
+                    index.setdefault(gram, []).append(i)
+        self.index = index
+
+    def to_dict(self):
+        return {'aliases': self.aliases, 'index': self.index}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['aliases'], data['index'])
+
+    def resolve(self, name):
+        """ISO3 for a country name (exact alias, then fuzzy), or None"""
+        key = normalize_name(name)
+        if not key:
+            return None
+        return self.aliases.get(key) or self.fuzzy(key)
+
+    def fuzzy(self, key, threshold=FUZZY_THRESHOLD):
+        """
+        Best trigram (Dice) match for a normalized name, or None when nothing
+        reaches the threshold or two different codes tie for the best score
+        """
+        grams = trigrams(key)
+        shared = Counter(i for gram in grams for i in self.index.get(gram, ()))
+        best = {}
+        for i, count in shared.items():
+            score = 2 * count / (len(grams) + self.sizes[i])
+            iso3 = self.aliases[self.names[i]]
+            best[iso3] = max(best.get(iso3, 0.0), score)
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < threshold:
+            return None
+        if len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+            return None
+        return ranked[0][0]
+
+
+def sources_digest(paths):
+    """Hash of the resolver's source files (missing files count as empty)"""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.encode())
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()
+
+
+def load_resolver(path=RESOLVER_FILE, alias_file=ALIAS_FILE, registry_file=REGISTRY_FILE,
+                  records_file=RECORDS_FILE, rebuild=False):
+    """The persisted resolver, rebuilt (and saved) when its sources changed"""
+    digest = sources_digest([alias_file, registry_file, records_file])
+    if not rebuild and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('sources') == digest:
+            return CountryResolver.from_dict(data)
+
+    with open(alias_file, 'r', encoding='utf-8') as f:
+        curated = json.load(f)
+    registry = load_registry(registry_file, offline=True)
+    records = []
+    if os.path.exists(records_file):
+        with open(records_file, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+    resolver = CountryResolver(build_aliases(curated, registry, records))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'built_at': datetime.now().isoformat(timespec='seconds'), 'sources': digest,
+                   **resolver.to_dict()}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return resolver
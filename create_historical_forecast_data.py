@@ -4,6 +4,10 @@ Create comprehensive historical (2019-2025) + forecast (2026-2030) dataset
 import json
 import numpy as np
 from scipy import interpolate
+from indicator_store import load_cube
+from fetch_live_data import score_history
+from pillar_scoring import PILLARS, pillar_share
+from synthetic_history import synthetic_history, synthetic_score_history, HISTORICAL_YEARS
 
 print("=" * 80)
 print("CREATING HISTORICAL + FORECAST TIMELINE DATA")
@@ -20,19 +24,42 @@ with open('resilience_forecasts_2025_2030.json', 'r') as f:
 # Create lookup
 forecast_lookup = {c['iso3']: c for c in forecast_data}
 
+# Real indicator history saved by fetch_live_data.py (synthetic fallback when missing)
+cube = load_cube()
+real_history = score_history(cube) if cube else {}
+
 print(f"\n✓ Loaded {len(current_data)} countries")
 print(f"✓ Loaded {len(forecast_data)} forecasts")
 
 # Generate historical timeline (2019-2025) + forecasts (2026-2030)
-years_historical = [2019, 2020, 2021, 2022, 2023, 2024, 2025]
+years_historical = HISTORICAL_YEARS
 years_forecast = [2026, 2027, 2028, 2029, 2030]
 all_years = years_historical + years_forecast
 
 print(f"\n📅 Creating timeline: {all_years[0]}-{all_years[-1]}")
+if real_history and all(y in cube.years for y in years_historical):
+    print(f"✓ Using real indicator history for {len(real_history)} countries")
+else:
+    real_history = {}
+    print("⚠️  No indicator history cube found - simulating 2019-2024")
+
+# Synthetic history seeded per ISO3 code (the same history forecast_resilience.py
+# fits); overall moves with the pillar average by the record's pillar share (the
+# INFORM part of a blended score held), rows without pillar data have a score history
+labels = [c['iso3'] or c['name'] for c in current_data]
+current_pillars = np.array([[c[p] for p in PILLARS] for c in current_data], dtype=np.float64)
+current_overall_scores = np.array([c['score'] for c in current_data], dtype=np.float64)
+shares = np.array([pillar_share(c) for c in current_data])
+synthetic_pillars = synthetic_history(current_pillars, labels, len(years_historical))
+synthetic_overall = np.clip(current_overall_scores[:, None]
+                            + shares[:, None] * (synthetic_pillars - current_pillars[..., None]).mean(axis=1), 0, 1)
+synthetic_overall[shares == 0] = synthetic_score_history(current_overall_scores, labels,
+                                                         len(years_historical))[shares == 0]
+synthetic_overall[current_overall_scores == 0] = 0
 
 timeline_data = []
 
-for country in current_data:
+for row, country in enumerate(current_data):
     iso3 = country['iso3']
     forecast = forecast_lookup.get(iso3)
     
@@ -43,37 +70,34 @@ for country in current_data:
     current_institutional = country['institutional']
     current_infrastructure = country['infrastructure']
     
-    # Generate historical trend (2019-2024)
-    # Use slight variations around current value
-    def generate_historical(current_value):
+    # Real history: keep the scored year-to-year movement (overall: by the pillar share),
+    # anchored on the current value; years before the first reported value (NaN) hold
+    # that value rather than invent movement
+    def real_historical(current_value, scored, share=1.0):
         if current_value == 0:
             return [0] * len(years_historical)
-        
-        # Create smooth historical trajectory
-        # Start slightly lower/higher and trend to current
-        volatility = np.random.uniform(0.02, 0.08)
-        trend = np.random.uniform(-0.01, 0.015)  # Slight upward bias
-        
-        historical = []
-        for i, year in enumerate(years_historical):
-            if year == 2025:
-                historical.append(current_value)
-            else:
-                # Years back from 2025
-                years_back = 2025 - year
-                deviation = np.random.normal(0, volatility) * (years_back / 6)
-                trend_component = -trend * years_back
-                value = current_value + deviation + trend_component
-                historical.append(np.clip(value, 0, 1))
-        
-        return historical
+        by_year = dict(zip(cube.years, scored))
+        anchor = by_year[years_historical[-1]]
+        values = np.clip(current_value + share * (np.array([by_year[year] for year in years_historical]) - anchor),
+                         0, 1)
+        reported = ~np.isnan(values)
+        if not reported.any():
+            return [current_value] * len(years_historical)
+        values[:np.argmax(reported)] = values[np.argmax(reported)]
+        return values.tolist()
     
     # Generate historical data
-    historical_overall = generate_historical(current_overall)
-    historical_financial = generate_historical(current_financial)
-    historical_social = generate_historical(current_social)
-    historical_institutional = generate_historical(current_institutional)
-    historical_infrastructure = generate_historical(current_infrastructure)
+    history = real_history.get(iso3) if shares[row] > 0 else None
+    if history:
+        historical_overall = real_historical(current_overall, history['overall'], shares[row])
+        historical_financial = real_historical(current_financial, history['financial'])
+        historical_social = real_historical(current_social, history['social'])
+        historical_institutional = real_historical(current_institutional, history['institutional'])
+        historical_infrastructure = real_historical(current_infrastructure, history['infrastructure'])
+    else:
+        historical_overall = synthetic_overall[row].tolist()
+        (historical_financial, historical_social,
+         historical_institutional, historical_infrastructure) = synthetic_pillars[row].tolist()
     
     # Combine with forecast data
     timeline_entry = {
@@ -97,18 +121,28 @@ for country in current_data:
             'type': 'historical'
         }
     
-    # Add forecast data
+    # Add forecast data (pillars from the joint pillar forecast, flat for older forecast files)
     if forecast:
+        pillar_forecasts = forecast.get('pillar_forecasts', {})
+        
+        def pillar_value(pillar, year):
+            by_year = pillar_forecasts.get(pillar)
+            if by_year:
+                return by_year.get(str(year), {}).get('mean', 0)
+            return round(forecast.get(pillar, 0), 3)
+        
         for year in years_forecast:
             forecast_year = forecast['forecasts'].get(str(year), {})
             timeline_entry['timeline'][str(year)] = {
                 'overall': forecast_year.get('mean', 0),
                 'overall_lower': forecast_year.get('lower', 0),
                 'overall_upper': forecast_year.get('upper', 0),
-                'financial': round(forecast.get('financial', 0), 3),
-                'social': round(forecast.get('social', 0), 3),
-                'institutional': round(forecast.get('institutional', 0), 3),
-                'infrastructure': round(forecast.get('infrastructure', 0), 3),
+                'overall_p25': forecast_year.get('p25', 0),
+                'overall_p75': forecast_year.get('p75', 0),
+                'financial': pillar_value('financial', year),
+                'social': pillar_value('social', year),
+                'institutional': pillar_value('institutional', year),
+                'infrastructure': pillar_value('infrastructure', year),
                 'type': 'forecast'
             }
     else:
@@ -1,5 +1,7 @@
 import json
 
+from country_centroids import load_centroids, fill_coordinates
+
 print("Creating integrated dashboard with map, analytics, and methodology...")
 
 # Load data
@@ -12,6 +14,10 @@ with open('world.geojson', 'r') as f:
 print(f"✓ Loaded {len(timeline_data)} countries")
 print(f"✓ Loaded {len(geojson_data['features'])} country boundaries")
 
+# Countries without coordinates get their world.geojson centroid
+coords_added = fill_coordinates(timeline_data, load_centroids())
+print(f"✓ Added centroid coordinates for {coords_added} countries")
+
 # Prepare data for JavaScript
 countries_data = []
 for country in timeline_data:
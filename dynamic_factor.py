@@ -0,0 +1,161 @@
+"""
+Dynamic factor model for the country x pillar x year resilience panel
+- Common factors extracted by principal components from every pillar series
+- Factors forecast once with the batched BSTS engine; their simulated paths
+  are shared by every country, so common shocks move all series together
+- Country series are split into a common part (loadings x factors) and an
+  idiosyncratic remainder for the per-country models
+- The estimate and its forecast are saved (cache/factor_model.npz) so they
+  stay stable between refreshes; series not in the saved fit are projected
+  onto the saved factors (project)
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from bsts_model import BSTSModel, simulate_paths
+
+FACTOR_MODEL_FILE = os.path.join('cache', 'factor_model.npz')
+
+
+class DynamicFactorModel:
+    """
+    X[series, year] = mean + loadings @ factors + idiosyncratic
+
+    Factors are scaled to the typical series' standard deviation so the BSTS
+    priors (set for 0-1 scores) suit them as well.
+    """
+
+    def __init__(self, n_factors=2):
+        self.n_factors = n_factors
+
+    def fit(self, panel, active=None):
+        """
+        Estimate loadings/factors from a [series, T] panel (NaN = missing).
+        Inactive series (e.g. pillars without data) get zero loadings.
+        Principal components come from the years every active series
+        observes; factors for the other years are regressed on the series
+        observed that year.
+        """
+        panel = np.asarray(panel, dtype=np.float64)
+        n, t = panel.shape
+        active = np.ones(n, dtype=bool) if active is None else np.asarray(active, dtype=bool)
+        observed = ~np.isnan(panel)
+        complete = observed[active].all(axis=0)
+        k = min(self.n_factors, int(active.sum()), max(int(complete.sum()) - 2, 0))
+
+        self.loadings = np.zeros((n, k))
+        self.factors = np.zeros((k, t))
+        self.explained = 0.0
+        if k == 0:
+            return self
+
+        centered = panel[active][:, complete]
+        centered = centered - centered.mean(axis=1, keepdims=True)
+        u, s, vt = np.linalg.svd(centered, full_matrices=False)
+        scale = float(np.median(centered.std(axis=1))) or 1.0
+        loadings = u[:, :k] * s[:k] / (scale * np.sqrt(complete.sum()))
+        self.loadings[active] = loadings
+        self.explained = float((s[:k] ** 2).sum() / (s ** 2).sum()) if s.any() else 0.0
+
+        # Factors for every year: cross-sectional regression on the observed series
+        means = np.nanmean(np.where(complete, panel, np.nan), axis=1)
+        for year in range(t):
+            rows = active & observed[:, year]
+            if rows.sum() >= k:
+                x = self.loadings[rows]
+                self.factors[:, year] = np.linalg.lstsq(x, panel[rows, year] - means[rows], rcond=None)[0]
+            else:
+                self.factors[:, year] = np.nan
+        return self
+
+    def project(self, panel):
+        """
+        Loadings [series, k] of a [series, T] panel on the estimated factors:
+        least squares on the years both observe, with an intercept for the
+        series mean. Series without data, or with too few years, get zero
+        loadings.
+        """
+        panel = np.asarray(panel, dtype=np.float64)
+        k = self.factors.shape[0]
+        loadings = np.zeros((len(panel), k))
+        if k == 0:
+            return loadings
+        for i, series in enumerate(panel):
+            years = ~np.isnan(series) & ~np.isnan(self.factors).any(axis=0)
+            if years.sum() <= k + 1 or not np.nan_to_num(series).any():
+                continue
+            x = np.column_stack([np.ones(years.sum()), self.factors[:, years].T])
+            loadings[i] = np.linalg.lstsq(x, series[years], rcond=None)[0][1:]
+        return loadings
+
+    def common(self):
+        """Common component loadings @ factors, [series, T]"""
+        return self.loadings @ np.nan_to_num(self.factors)
+
+    def forecast(self, h, n_draws, seed=0):
+        """
+        Fit the factor BSTS and forecast it once.
+        Returns (factor mean [k, h], simulated factor paths [k, draws, h]).
+        """
+        k = self.loadings.shape[1]
+        if k == 0:
+            return np.zeros((0, h)), np.zeros((0, n_draws, h))
+        model = BSTSModel(self.factors).estimate().fit()
+        mean = model.forecast(h, n_draws=1)['mean']
+        paths = simulate_paths(model.levels[:, -1], model.trends[:, -1], model.state_cov,
+                               np.exp(model.log_variances), h, n_draws,
+                               [seed + j for j in range(k)])
+        # Centre the shared draws on the mean so the common part only adds spread
+        return mean, paths - paths.mean(axis=1, keepdims=True) + mean[:, None, :]
+
+    def digest(self):
+        """Hex digest of the estimated model, for cache keys of dependent forecasts"""
+        digest = hashlib.sha1(np.ascontiguousarray(self.loadings).tobytes())
+        digest.update(np.ascontiguousarray(self.factors).tobytes())
+        return digest.hexdigest()
+
+
+def save_factor_model(dfm, labels, panel, factor_mean, factor_paths, settings, path=FACTOR_MODEL_FILE):
+    """
+    Persist a fitted model with the [country, pillar, T] panel it was fitted
+    on (labels per country), its factor forecast and the settings it was
+    fitted with ({name: number})
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, labels=np.array(labels, dtype=str), panel=panel, loadings=dfm.loadings,
+                        factors=dfm.factors, explained=dfm.explained, factor_mean=factor_mean,
+                        factor_paths=factor_paths, fitted_at=np.datetime64('now', 's'),
+                        **{f"setting_{name}": value for name, value in settings.items()})
+    os.replace(tmp_path, path)
+
+
+def load_factor_model(path=FACTOR_MODEL_FILE):
+    """
+    (dfm, labels, panel, factor mean, factor paths, settings, fitted_at) as
+    saved by save_factor_model, or None without a saved model
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        dfm = DynamicFactorModel(data['factors'].shape[0])
+        dfm.loadings, dfm.factors, dfm.explained = data['loadings'], data['factors'], float(data['explained'])
+        settings = {name[len('setting_'):]: data[name].item() for name in data.files if name.startswith('setting_')}
+        return (dfm, data['labels'].tolist(), data['panel'], data['factor_mean'], data['factor_paths'],
+                settings, data['fitted_at'][()])
+
+
+def panel_change(old_labels, old_panel, labels, panel):
+    """
+    Relative change between two labelled [country, ...] panels: Frobenius
+    norm of the difference over the norm of the old panel, countries matched
+    by label (added or dropped countries count in full, NaN as 0)
+    """
+    old = dict(zip(old_labels, np.nan_to_num(old_panel)))
+    new = dict(zip(labels, np.nan_to_num(panel)))
+    zeros = np.zeros(np.shape(panel)[1:])
+    diff = sum(float(((new.get(l, zeros) - old.get(l, zeros)) ** 2).sum()) for l in set(old) | set(new))
+    return float(np.sqrt(diff / max(float((np.nan_to_num(old_panel) ** 2).sum()), 1e-12)))
@@ -3,22 +3,52 @@ Fetch live resilience data from multiple sources
 - World Bank API (Financial, Social, Institutional, Infrastructure indicators)
 - INFORM Risk scores
 - Process and normalize into resilience scores
+
+Usage:
+    python fetch_live_data.py [--concurrency N] [--rate REQ_PER_SEC]
+                              [--batch-size N] [--page-size N]
+                              [--cache-dir DIR | --no-cache] [--offline]
+                              [--incremental] [--resume [--resume-max-age HOURS]]
+                              [--base-url URL] [--refresh-registry]
 """
 
+import argparse
+import codecs
+import hashlib
 import json
+import os
+import threading
+import numpy as np
 import requests
-import pandas as pd
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import time
-
-print("=" * 80)
-print("GLOBAL RESILIENCE DATA FETCHER")
-print("=" * 80)
+from indicator_store import IndicatorCube, CUBE_FILE, years_in_range, changed_countries, load_cube
+from pillar_scoring import PILLARS, score_matrix
+from country_registry import WB_PUBLIC_API, REGISTRY_FILE, load_registry, country_codes
 
 # Configuration
-BASE_URL_WB = "https://api.worldbank.org/v2"
+BASE_URL_WB = os.environ.get('WB_API_URL', WB_PUBLIC_API)  # Override for local stand-ins
 DATE_RANGE = "2019:2025"  # Most recent 5 years
 ALL_COUNTRIES = "all"
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 4.0  # Requests per second across all workers
+CACHE_DIR = os.path.join('cache', 'worldbank')
+REFRESH_STATE_FILE = os.path.join('cache', 'refresh_state.json')
+CHECKPOINT_DIR = os.path.join('cache', 'checkpoints')
+DEFAULT_RESUME_MAX_AGE = 12  # Hours a checkpoint stays usable for --resume
+OUTPUT_FILE = 'resilience_data_live.json'
+DEFAULT_BATCH_SIZE = 8  # Indicators per batched request
+DEFAULT_PAGE_SIZE = 10000  # Records per page
+STREAM_CHUNK_SIZE = 64 * 1024  # Bytes read per streaming parse step
+
+# World Bank data source per indicator (batched requests must share a source)
+DEFAULT_SOURCE = 2  # World Development Indicators
+INDICATOR_SOURCES = {
+    code: 3  # Worldwide Governance Indicators
+    for code in ['CC.EST', 'GE.EST', 'RL.EST', 'RQ.EST', 'PV.EST', 'VA.EST']
+}
 
 # Indicator mappings
 INDICATORS = {
@@ -56,212 +86,550 @@ INDICATORS = {
     }
 }
 
-def fetch_indicator(indicator_code, max_retries=3):
-    """Fetch data for a single indicator from World Bank API"""
-    url = f"{BASE_URL_WB}/country/{ALL_COUNTRIES}/indicator/{indicator_code}"
+class TokenBucket:
+    """Thread-safe token bucket shared by all fetch workers (replaces fixed sleeps)"""
+    
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def create_session(pool_size=DEFAULT_CONCURRENCY):
+    """Create a requests.Session whose connection pool matches the worker count"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+class ResponseCache:
+    """
+    On-disk cache of World Bank responses.
+    - Page entries hold one API page, folded into per-indicator
+      {country: {year: value}} series, plus the ETag/Last-Modified validators
+      used for conditional revalidation
+    - Indicator entries hold the series of one indicator for a date range
+      (used offline, for incremental refreshes and as a fallback)
+    """
+    
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.stats = {'fresh': 0, 'revalidated': 0, 'offline': 0, 'missing': 0}
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def indicator_key(indicator_code, date_range):
+        return f"{indicator_code}_{date_range.replace(':', '-')}"
+    
+    @staticmethod
+    def page_key(codes, source, date_range, page, per_page):
+        digest = hashlib.sha1(';'.join(sorted(codes)).encode()).hexdigest()[:12]
+        return f"batch_{source}_{digest}_{date_range.replace(':', '-')}_n{per_page}_p{page}"
+    
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def load(self, key):
+        try:
+            with open(self.path(key), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if 'series' in entry else None  # Ignore pre-streaming raw-record entries
+    
+    def load_indicator(self, indicator_code, date_range):
+        return self.load(self.indicator_key(indicator_code, date_range))
+    
+    def store(self, key, series, headers=None, meta=None, source_updated=None):
+        headers = headers or {}
+        entry = {
+            'key': key,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'source_updated': source_updated,
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+            'meta': meta,
+            'series': series
+        }
+        path = self.path(key)
+        tmp_path = f"{path}.tmp.{threading.get_ident()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)  # Atomic: readers never see a partial file
+        return entry
+    
+    def store_indicator(self, indicator_code, date_range, series, source_updated=None):
+        return self.store(self.indicator_key(indicator_code, date_range), series,
+                          source_updated=source_updated)
+    
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def count(self, outcome, n=1):
+        with self.lock:
+            self.stats[outcome] += n
+
+def batch_jobs(jobs, batch_size=DEFAULT_BATCH_SIZE):
+    """Group (pillar, name, code) jobs by World Bank source into batches of at most batch_size"""
+    by_source = {}
+    for job in jobs:
+        by_source.setdefault(INDICATOR_SOURCES.get(job[2], DEFAULT_SOURCE), []).append(job)
+    batches = []
+    for source, source_jobs in by_source.items():
+        for start in range(0, len(source_jobs), max(1, batch_size)):
+            batches.append((source, source_jobs[start:start + max(1, batch_size)]))
+    return batches
+
+def iter_page_stream(chunks):
+    """
+    Incrementally parse a World Bank page '[{meta}, [{record}, ...]]' from
+    byte chunks. Yields the page metadata first, then every record whose
+    'value' is not null; only the record being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf, pos = '', 0
+    
+    def more():
+        nonlocal buf, pos
+        for chunk in chunks:
+            text = utf8.decode(chunk)
+            if text:
+                buf, pos = buf[pos:] + text, 0
+                return True
+        return False
+    
+    def peek():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not more():
+                return None
+    
+    def value():
+        nonlocal pos
+        peek()  # raw_decode does not skip leading whitespace
+        while True:
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+                return obj
+            except json.JSONDecodeError:
+                if not more():
+                    raise
+    
+    def expect(char):
+        nonlocal pos
+        found = peek()
+        if found != char:
+            raise ValueError(f"Unexpected {found!r} in World Bank response (expected {char!r})")
+        pos += 1
+    
+    expect('[')
+    yield value()  # Page metadata
+    if peek() == ']':
+        return  # Error responses only carry a message
+    expect(',')
+    if peek() == 'n':
+        value()  # null: no records
+        return
+    expect('[')
+    if peek() == ']':
+        return
+    while True:
+        record = value()
+        if record.get('value') is not None:
+            yield record
+        if peek() == ',':
+            pos += 1
+        else:
+            expect(']')
+            return
+
+def fold_records(records, codes):
+    """
+    Fold raw records straight into per-indicator {country: {year: value}} series.
+    Records of a batched request are routed by their indicator id.
+    """
+    series = {code: {} for code in codes}
+    for item in records:
+        if item['value'] is None:
+            continue
+        code = item['indicator']['id'] if len(codes) > 1 else codes[0]
+        if code in series:
+            series[code].setdefault(item['countryiso3code'], {})[int(item['date'])] = float(item['value'])
+    return series
+
+def merge_series(target, series):
+    """Merge {country: {year: value}} series into target in place"""
+    for iso3, by_year in series.items():
+        target.setdefault(iso3, {}).update(by_year)
+    return target
+
+def series_from_json(series):
+    """JSON object keys are strings; restore integer years"""
+    return {iso3: {int(year): value for year, value in by_year.items()} for iso3, by_year in series.items()}
+
+def api_message(meta):
+    """Text of a World Bank error page '[{"message": [{"id", "key", "value"}, ...]}]'"""
+    messages = meta['message'] if isinstance(meta['message'], list) else [meta['message']]
+    return '; '.join(str(m.get('value') or m.get('key') or m) if isinstance(m, dict) else str(m)
+                     for m in messages)
+
+def fetch_page(url, params, codes, cache_key, session=None, limiter=None, cache=None, max_retries=3):
+    """
+    Fetch one API page, revalidating against the cached copy when there is one.
+    The body is parsed as a stream and folded per indicator as it arrives.
+    Returns (meta, {code: series}); meta is None when the page could not be fetched.
+    An API error page is returned as its meta (with 'message') and no series,
+    and is neither retried nor cached.
+    """
+    cached = cache.load(cache_key) if cache else None
+    headers = cache.conditional_headers(cached) if cache else {}
+    http = session or requests
+    
+    for attempt in range(max_retries):
+        if limiter:
+            limiter.acquire()  # Rate limiting
+        try:
+            with http.get(url, params=params, headers=headers, timeout=30, stream=True) as response:
+                if response.status_code == 304 and cached:
+                    cache.count('revalidated')
+                    return cached['meta'], {code: series_from_json(s) for code, s in cached['series'].items()}
+                if response.status_code == 200:
+                    items = iter_page_stream(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+                    meta = next(items)
+                    if isinstance(meta, dict) and 'message' in meta:
+                        return meta, {}
+                    if isinstance(meta, dict):
+                        series = fold_records(items, codes)
+                        if cache:
+                            cache.store(cache_key, series, response.headers, meta=meta)
+                            cache.count('fresh')
+                        return meta, series
+        except Exception as e:
+            print(f"  ⚠️  {url.rsplit('/', 1)[-1]} page {params.get('page', 1)} attempt {attempt + 1} failed: {e}")
+    
+    return None, {}
+
+def fetch_indicators(codes, source=DEFAULT_SOURCE, session=None, limiter=None, cache=None, offline=False,
+                     page_size=DEFAULT_PAGE_SIZE):
+    """
+    Fetch several indicators of one source in a single batched request,
+    following page/pages pagination, and demultiplex the records per indicator.
+    A batch the API rejects (e.g. a code outside the assumed source) is
+    refetched one indicator per request, without `source`.
+    Returns {code: {country: {year: value}}}.
+    """
+    if offline:
+        result = {}
+        for code in codes:
+            cached = cache.load_indicator(code, DATE_RANGE) if cache else None
+            if cache:
+                cache.count('offline' if cached else 'missing')
+            result[code] = series_from_json(cached['series']) if cached else {}
+        return result
+    
+    url = f"{BASE_URL_WB}/country/{ALL_COUNTRIES}/indicator/{';'.join(codes)}"
     params = {
         'format': 'json',
         'date': DATE_RANGE,
-        'per_page': 20000
+        'per_page': page_size
     }
+    if len(codes) > 1:
+        params['source'] = source  # Required for multi-indicator requests
     
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                if len(data) > 1 and data[1]:
-                    return data[1]
-            time.sleep(1)  # Rate limiting
-        except Exception as e:
-            print(f"  ⚠️  Attempt {attempt + 1} failed: {e}")
-            time.sleep(2)
-    
-    return []
-
-def process_indicator_data(data_list):
-    """Process raw indicator data into country-year dictionary"""
-    result = {}
-    for item in data_list:
-        if item['value'] is not None:
-            country_code = item['countryiso3code']
-            year = int(item['date'])
-            value = float(item['value'])
-            
-            if country_code not in result or year > result[country_code]['year']:
-                result[country_code] = {'value': value, 'year': year}
-    
-    return result
-
-def normalize_score(value, min_val, max_val, reverse=False):
-    """Normalize a value to 0-1 scale"""
-    if value is None or pd.isna(value):
-        return 0
-    
-    if reverse:
-        # For indicators where lower is better (e.g., debt, Gini)
-        normalized = 1 - ((value - min_val) / (max_val - min_val))
-    else:
-        # For indicators where higher is better
-        normalized = (value - min_val) / (max_val - min_val)
-    
-    return max(0, min(1, normalized))
-
-def calculate_pillar_score(country_data, pillar):
-    """Calculate resilience score for a pillar based on available indicators"""
-    scores = []
-    
-    for indicator, value_info in country_data.get(pillar, {}).items():
-        if value_info and 'value' in value_info:
-            value = value_info['value']
-            
-            # Normalize based on indicator type
-            if pillar == 'financial':
-                if indicator in ['debt_to_gdp']:
-                    score = normalize_score(value, 0, 200, reverse=True)
-                elif indicator == 'fx_reserves':
-                    score = normalize_score(value, 0, 12, reverse=False)
-                elif indicator == 'fdi':
-                    score = normalize_score(value, -5, 10, reverse=False)
-                elif indicator == 'gdp_growth':
-                    score = normalize_score(value, -10, 15, reverse=False)
-                else:
-                    score = 0.5
-            
-            elif pillar == 'social':
-                if indicator == 'gini':
-                    score = normalize_score(value, 25, 65, reverse=True)
-                elif indicator == 'poverty':
-                    score = normalize_score(value, 0, 50, reverse=True)
-                elif indicator in ['water', 'life_expectancy']:
-                    score = normalize_score(value, 40, 100, reverse=False)
-                elif indicator == 'savings':
-                    score = normalize_score(value, -10, 40, reverse=False)
-                else:
-                    score = 0.5
-            
-            elif pillar == 'institutional':
-                # WGI indicators are typically -2.5 to +2.5
-                score = normalize_score(value, -2.5, 2.5, reverse=False)
-            
-            elif pillar == 'infrastructure':
-                if indicator in ['electricity', 'internet', 'paved_roads']:
-                    score = normalize_score(value, 0, 100, reverse=False)
-                elif indicator == 'road_density':
-                    score = normalize_score(value, 0, 200, reverse=False)
-                elif indicator == 'logistics':
-                    score = normalize_score(value, 1, 5, reverse=False)
-                else:
-                    score = 0.5
-            
+    by_code = {code: {} for code in codes}
+    source_updated = None
+    page, pages, complete = 1, 1, True
+    while page <= pages:
+        cache_key = ResponseCache.page_key(codes, source, DATE_RANGE, page, page_size)
+        meta, series = fetch_page(url, dict(params, page=page), codes, cache_key, session, limiter, cache)
+        if meta is None:
+            complete = False
+            break
+        if 'message' in meta:
+            print(f"  ⚠️  {';'.join(codes)} (source {source}) rejected: {api_message(meta)}")
+            if len(codes) > 1:
+                print(f"     retrying {len(codes)} indicators one per request")
+                return {code: fetch_indicators([code], source, session, limiter, cache, offline, page_size)[code]
+                        for code in codes}
+            complete = False
+            break
+        pages = int(meta.get('pages') or 1)
+        source_updated = source_updated or meta.get('lastupdated')
+        for code, page_series in series.items():
+            merge_series(by_code[code], page_series)
+        page += 1
+    
+    for code in codes:
+        if complete and by_code[code]:
+            if cache:
+                cache.store_indicator(code, DATE_RANGE, by_code[code], source_updated=source_updated)
+            continue
+        # Upstream unavailable: fall back to the last good response if we have one
+        cached = cache.load_indicator(code, DATE_RANGE) if cache else None
+        if cached:
+            print(f"  ⚠️  {code}: using cached response from {cached['fetched_at']}")
+            cache.count('offline')
+            by_code[code] = series_from_json(cached['series'])
+        elif not complete:
+            by_code[code] = {}
+    return by_code
+
+def fetch_indicator(indicator_code, session=None, limiter=None, cache=None, offline=False):
+    """Fetch one indicator as a {country: {year: value}} series (API or response cache)"""
+    source = INDICATOR_SOURCES.get(indicator_code, DEFAULT_SOURCE)
+    return fetch_indicators([indicator_code], source, session, limiter, cache, offline)[indicator_code]
+
+def fetch_source_stamp(indicator_code, session=None, limiter=None, cache=None, offline=False):
+    """
+    Upstream 'lastupdated' stamp for an indicator via a one-record probe.
+    Offline, the stamp recorded with the cached response is used instead.
+    """
+    if offline:
+        cached = cache.load_indicator(indicator_code, DATE_RANGE) if cache else None
+        return cached.get('source_updated') if cached else None
+    
+    url = f"{BASE_URL_WB}/country/{ALL_COUNTRIES}/indicator/{indicator_code}"
+    params = {'format': 'json', 'date': DATE_RANGE, 'per_page': 1}
+    if limiter:
+        limiter.acquire()  # Rate limiting
+    try:
+        response = (session or requests).get(url, params=params, timeout=30)
+        if response.status_code == 200:
+            return response.json()[0].get('lastupdated')
+    except Exception as e:
+        print(f"  ⚠️  {indicator_code} probe failed: {e}")
+    return None
+
+def indicator_jobs():
+    """(pillar, name, code) for every indicator in INDICATORS"""
+    return [(pillar, name, code)
+            for pillar, indicators in INDICATORS.items()
+            for name, code in indicators.items()]
+
+def checkpoint_path(code):
+    return os.path.join(CHECKPOINT_DIR, f"{code}_{DATE_RANGE.replace(':', '-')}.json")
+
+def save_checkpoint(pillar, name, code, series):
+    """Atomically persist one fetched indicator so a crashed run can resume"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    path = checkpoint_path(code)
+    checkpoint = {
+        'pillar': pillar,
+        'name': name,
+        'indicator': code,
+        'date_range': DATE_RANGE,
+        'saved_at': time.time(),
+        'series': series
+    }
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+def load_checkpoint(code, max_age_hours):
+    """Checkpointed series for an indicator, or None if missing or older than max_age_hours"""
+    try:
+        with open(checkpoint_path(code), 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - checkpoint['saved_at'] > max_age_hours * 3600:
+        return None
+    return series_from_json(checkpoint['series'])
+
+def clear_checkpoints():
+    """Drop checkpoints once a run has produced its output"""
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return
+    for filename in os.listdir(CHECKPOINT_DIR):
+        os.remove(os.path.join(CHECKPOINT_DIR, filename))
+
+def fetch_all_indicators(concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, cache=None, offline=False, jobs=None,
+                         batch_size=DEFAULT_BATCH_SIZE, page_size=DEFAULT_PAGE_SIZE, resume_max_age=None):
+    """
+    Fetch every indicator in INDICATORS (or just `jobs`) through a bounded thread pool,
+    batching indicators that share a World Bank source into one paginated request.
+    Returns (all_data, latencies) where latencies maps each batched request
+    (source and the indicators it carried) to the seconds it took.
+    With offline=True every indicator is served from the response cache.
+    Each fetched indicator is checkpointed as soon as it completes; with
+    resume_max_age (hours) indicators checkpointed within that window are skipped.
+    """
+    concurrency = max(1, concurrency)
+    session = create_session(concurrency)
+    limiter = TokenBucket(rate)
+    
+    jobs = indicator_jobs() if jobs is None else jobs
+    all_data = {pillar: {} for pillar in INDICATORS}
+    latencies = {}
+    
+    if resume_max_age is not None:
+        pending = []
+        for pillar, name, code in jobs:
+            series = load_checkpoint(code, resume_max_age)
+            if series:
+                all_data[pillar][name] = series
             else:
-                score = 0.5
-            
-            scores.append(score)
+                pending.append((pillar, name, code))
+        print(f"  ↻ Resuming: {len(jobs) - len(pending)} indicators from checkpoints, {len(pending)} to fetch")
+        jobs = pending
+    batches = batch_jobs(jobs, batch_size)
+    
+    def run(batch):
+        source, members = batch
+        started = time.perf_counter()
+        processed = fetch_indicators([code for _, _, code in members], source, session, limiter,
+                                     cache, offline, page_size)
+        return source, members, processed, time.perf_counter() - started
     
-    return sum(scores) / len(scores) if scores else 0
+    current = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run, batch) for batch in batches]
+        for future in as_completed(futures):
+            source, members, processed, elapsed = future.result()
+            latencies[f"source {source}: " + ", ".join(name for _, name, _ in members)] = elapsed
+            for pillar, name, code in members:
+                current += 1
+                label = f"  [{current}/{len(jobs)}] {pillar}/{name} ({code})"
+                if processed[code]:
+                    all_data[pillar][name] = processed[code]
+                    if not offline:
+                        save_checkpoint(pillar, name, code, processed[code])
+                    print(f"{label} ✓ {len(processed[code])} countries (batch {elapsed:.2f}s)")
+                else:
+                    print(f"{label} ✗ No data (batch {elapsed:.2f}s)")
+    
+    session.close()
+    return all_data, latencies
+
+def print_latency_report(latencies, wall_time):
+    """Print the latency summary of the batched requests"""
+    if not latencies:
+        return
+    values = sorted(latencies.values())
+    print(f"\n⏱️  Fetch latency ({len(values)} batched requests, wall clock {wall_time:.2f}s):")
+    print(f"   Sum of request times: {sum(values):.2f}s")
+    print(f"   Median: {values[len(values) // 2]:.2f}s  Max: {values[-1]:.2f}s")
+    slowest = sorted(latencies.items(), key=lambda x: x[1], reverse=True)[:5]
+    print("   Slowest:")
+    for key, elapsed in slowest:
+        print(f"     {key:40s} {elapsed:.2f}s")
 
-print("\n📊 Fetching data from World Bank API...")
-print(f"Date range: {DATE_RANGE}")
+def build_indicator_cube(all_data):
+    """Pack the fetched series into the country x year x indicator cube"""
+    return IndicatorCube.from_indicator_data(all_data, years_in_range(DATE_RANGE))
 
-# Fetch all indicators
-all_data = {}
-total_indicators = sum(len(indicators) for indicators in INDICATORS.values())
-current = 0
+def score_cube(cube, year=None, missing=0.0):
+    """
+    Score every country in the cube from the latest values known as of `year`.
+    Returns (pillar_scores [country, pillar] in PILLARS order, overall [country]);
+    pillars without any reported indicator score `missing`.
+    """
+    values, _ = cube.as_of(year)
+    return score_matrix(values, cube.indicators, cube.pillars, missing=missing)
 
-for pillar, indicators in INDICATORS.items():
-    print(f"\n{pillar.upper()} Pillar:")
-    all_data[pillar] = {}
+def score_history(cube):
+    """
+    Score every country for every year in the cube using the data known as of
+    that year. Returns {iso3: {'overall' | pillar: [score per cube year]}}.
+    Years before a pillar's first reported indicator are NaN (missing, not 0),
+    and so is overall in those years; a pillar never reported scores 0
+    throughout, as it does in the current scores.
+    """
+    yearly = [score_cube(cube, year, missing=np.nan)[0] for year in cube.years]
+    pillar_scores = np.stack(yearly, axis=1)  # [country, year, pillar]
+    never_reported = np.isnan(pillar_scores).all(axis=1, keepdims=True)
+    pillar_scores = np.where(never_reported, 0.0, pillar_scores)
+    overall = np.round(pillar_scores.mean(axis=-1), 3)  # [country, year]
+    pillar_scores = np.round(pillar_scores, 3)
+    history = {}
+    for i, iso3 in enumerate(cube.countries):
+        entry = {pillar: pillar_scores[i, :, p].tolist() for p, pillar in enumerate(PILLARS)}
+        entry['overall'] = overall[i].tolist()
+        history[iso3] = entry
+    return history
+
+def build_country_dataset(cube, registry, only=None):
+    """
+    Score every country in the cube (latest values) and build the output rows.
+    Aggregates and unknown codes are dropped via the country registry, which
+    also supplies name/region/income/coordinates; with an empty registry every
+    cube row is kept, named by its ISO3 code.
+    `only` restricts the rows to a set of ISO3 codes.
+    """
+    countries = country_codes(registry) if registry else None
+    if only is not None:
+        keep = sorted(cube.country_index[iso3] for iso3 in only)
+        cube = IndicatorCube([cube.countries[i] for i in keep], cube.years,
+                             cube.indicators, cube.pillars, cube.values[keep])
+    pillar_scores, overall_scores = score_cube(cube)
+    
+    # Build country dataset
+    country_dataset = []
     
-    for name, code in indicators.items():
-        current += 1
-        print(f"  [{current}/{total_indicators}] Fetching {name} ({code})...", end=" ")
+    for i, iso3 in enumerate(cube.countries):
+        # Skip aggregates (regions, income groups, IDA/IBRD, ...)
+        if countries is not None and iso3 not in countries:
+            continue
         
-        raw_data = fetch_indicator(code)
-        if raw_data:
-            processed = process_indicator_data(raw_data)
-            all_data[pillar][name] = processed
-            print(f"✓ {len(processed)} countries")
-        else:
-            print("✗ No data")
+        # Pillar scores from the most recent value of each indicator
+        scores = dict(zip(PILLARS, pillar_scores[i]))
+        scores['overall'] = overall_scores[i]
         
-        time.sleep(0.5)  # Rate limiting
-
-print("\n" + "=" * 80)
-print("PROCESSING AND CALCULATING RESILIENCE SCORES")
-print("=" * 80)
-
-# Get list of all countries
-all_countries = set()
-for pillar_data in all_data.values():
-    for indicator_data in pillar_data.values():
-        all_countries.update(indicator_data.keys())
-
-print(f"\n✓ Found {len(all_countries)} countries with data")
-
-# Build country dataset
-country_dataset = []
-
-# Load existing data for coordinates and names
-try:
-    with open('resilience_data_cleaned.json', 'r') as f:
-        existing_data = {c['iso3']: c for c in json.load(f)}
-except:
-    existing_data = {}
-
-for iso3 in sorted(all_countries):
-    # Skip aggregate regions
-    if iso3 in ['WLD', 'EAS', 'ECS', 'LCN', 'MEA', 'NAC', 'SAS', 'SSF']:
-        continue
-    
-    # Gather all indicator values for this country
-    country_indicators = {}
-    for pillar in INDICATORS.keys():
-        country_indicators[pillar] = {}
-        for indicator in INDICATORS[pillar].keys():
-            if indicator in all_data[pillar] and iso3 in all_data[pillar][indicator]:
-                country_indicators[pillar][indicator] = all_data[pillar][indicator][iso3]
-    
-    # Calculate pillar scores
-    financial_score = calculate_pillar_score(country_indicators, 'financial')
-    social_score = calculate_pillar_score(country_indicators, 'social')
-    institutional_score = calculate_pillar_score(country_indicators, 'institutional')
-    infrastructure_score = calculate_pillar_score(country_indicators, 'infrastructure')
-    
-    # Calculate overall score (average of pillars)
-    pillar_scores = [financial_score, social_score, institutional_score, infrastructure_score]
-    overall_score = sum(pillar_scores) / 4 if any(pillar_scores) else 0
-    
-    # Get country info from existing data
-    existing = existing_data.get(iso3, {})
-    
-    country_entry = {
-        'iso3': iso3,
-        'name': existing.get('name', iso3),
-        'region': existing.get('region', ''),
-        'income': existing.get('income', ''),
-        'lat': existing.get('lat'),
-        'lon': existing.get('lon'),
-        'score': round(overall_score, 3),
-        'financial': round(financial_score, 3),
-        'social': round(social_score, 3),
-        'institutional': round(institutional_score, 3),
-        'infrastructure': round(infrastructure_score, 3),
-        'last_updated': datetime.now().strftime('%Y-%m-%d')
-    }
+        # Country info from the registry
+        info = registry.get(iso3, {})
+        
+        country_entry = {
+            'iso3': iso3,
+            'name': info.get('name', iso3),
+            'region': info.get('region', ''),
+            'income': info.get('income', ''),
+            'lat': info.get('lat'),
+            'lon': info.get('lon'),
+            'score': round(scores['overall'], 3),
+            'financial': round(scores['financial'], 3),
+            'social': round(scores['social'], 3),
+            'institutional': round(scores['institutional'], 3),
+            'infrastructure': round(scores['infrastructure'], 3),
+            'last_updated': datetime.now().strftime('%Y-%m-%d')
+        }
+        
+        country_dataset.append(country_entry)
     
-    country_dataset.append(country_entry)
-
-# Save to file
-output_file = 'resilience_data_live.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(country_dataset, f, indent=2, ensure_ascii=False)
+    return country_dataset
 
-print(f"\n✅ Saved {len(country_dataset)} countries to {output_file}")
-
-# Statistics
-scores_with_data = [c for c in country_dataset if c['score'] > 0]
-if scores_with_data:
+def print_statistics(country_dataset):
+    """Print score range plus top/bottom countries"""
+    scores_with_data = [c for c in country_dataset if c['score'] > 0]
+    if not scores_with_data:
+        return
     scores = [c['score'] for c in scores_with_data]
     print(f"\n📈 Statistics:")
     print(f"   Countries with scores: {len(scores_with_data)}")
@@ -280,6 +648,212 @@ if scores_with_data:
     for i, country in enumerate(bottom5, 1):
         print(f"   {i}. {country['name']} ({country['iso3']}): {country['score']:.3f}")
 
-print("\n" + "=" * 80)
-print("✅ DONE! Run 'python create_choropleth_map.py' with the new data file.")
-print("=" * 80)
+def write_output(country_dataset, output_file=OUTPUT_FILE):
+    """Write the country rows atomically so readers never see a partial file"""
+    tmp_path = f"{output_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(country_dataset, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, output_file)
+
+def load_refresh_state():
+    try:
+        with open(REFRESH_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_refresh_state(stamps):
+    """Record the upstream stamps the current output was built from"""
+    os.makedirs(os.path.dirname(REFRESH_STATE_FILE), exist_ok=True)
+    state = {
+        'date_range': DATE_RANGE,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'indicators': stamps
+    }
+    with open(REFRESH_STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=2)
+
+def cached_stamps(cache):
+    """Source stamps recorded with the cached responses (None without a cache)"""
+    stamps = {}
+    for _, _, code in indicator_jobs():
+        cached = cache.load_indicator(code, DATE_RANGE) if cache else None
+        stamps[code] = cached.get('source_updated') if cached else None
+    return stamps
+
+def full_refresh(args, cache, registry):
+    """Fetch every indicator, rebuild the cube and rewrite the output file"""
+    started = time.perf_counter()
+    all_data, latencies = fetch_all_indicators(args.concurrency, args.rate, cache=cache, offline=args.offline,
+                                               batch_size=args.batch_size, page_size=args.page_size,
+                                               resume_max_age=args.resume_max_age if args.resume else None)
+    print_latency_report(latencies, time.perf_counter() - started)
+    if cache:
+        print_cache_stats(cache)
+    
+    print("\n" + "=" * 80)
+    print("PROCESSING AND CALCULATING RESILIENCE SCORES")
+    print("=" * 80)
+    
+    cube = build_indicator_cube(all_data)
+    cube.save(CUBE_FILE)
+    print(f"\n✓ Saved indicator history {cube.values.shape} (countries x years x indicators) to {CUBE_FILE}")
+    
+    country_dataset = build_country_dataset(cube, registry)
+    
+    # Save to file
+    write_output(country_dataset)
+    save_refresh_state(cached_stamps(cache))
+    clear_checkpoints()
+    
+    print(f"\n✅ Saved {len(country_dataset)} countries to {OUTPUT_FILE}")
+    return country_dataset
+
+def incremental_refresh(args, cache, registry):
+    """
+    Refetch only indicators whose upstream stamp moved, rescore only the
+    countries whose inputs changed and patch those rows in the output file.
+    Returns the patched rows, or None when there is no previous run to patch.
+    """
+    previous = load_cube()
+    state = load_refresh_state()
+    if previous is None or not os.path.exists(OUTPUT_FILE) or state.get('date_range') != DATE_RANGE:
+        return None
+    
+    # Probe upstream stamps (cheap one-record requests)
+    print("\n🔎 Checking upstream stamps...")
+    jobs = indicator_jobs()
+    known = state.get('indicators', {})
+    session = create_session(max(1, args.concurrency))
+    limiter = TokenBucket(args.rate)
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+        stamps = dict(zip([code for _, _, code in jobs],
+                          pool.map(lambda job: fetch_source_stamp(job[2], session, limiter, cache, args.offline), jobs)))
+    session.close()
+    
+    stale = [(pillar, name, code) for pillar, name, code in jobs
+             if stamps[code] is None or stamps[code] != known.get(code) or name not in previous.indicator_index]
+    print(f"✓ {len(jobs) - len(stale)} indicators unchanged, {len(stale)} to refetch")
+    
+    all_data = previous.to_indicator_data()
+    fetched = {}
+    if stale:
+        started = time.perf_counter()
+        fetched, latencies = fetch_all_indicators(args.concurrency, args.rate, cache=cache,
+                                                  offline=args.offline, jobs=stale,
+                                                  batch_size=args.batch_size, page_size=args.page_size,
+                                                  resume_max_age=args.resume_max_age if args.resume else None)
+        print_latency_report(latencies, time.perf_counter() - started)
+        if cache:
+            print_cache_stats(cache)
+        for pillar, indicators in fetched.items():
+            all_data.setdefault(pillar, {}).update(indicators)
+    
+    cube = build_indicator_cube(all_data)
+    moved = changed_countries(previous, cube)
+    
+    print("\n" + "=" * 80)
+    print("RESCORING CHANGED COUNTRIES")
+    print("=" * 80)
+    print(f"\n✓ {len(moved)} of {len(cube.countries)} countries have changed inputs")
+    
+    with open(OUTPUT_FILE, 'r') as f:
+        country_dataset = json.load(f)
+    
+    if moved:
+        cube.save(CUBE_FILE)
+        patched = {c['iso3']: c for c in build_country_dataset(cube, registry, only=moved)}
+        rows = []
+        for country in country_dataset:
+            rows.append(patched.pop(country['iso3'], country))
+        rows.extend(patched.values())  # Countries new to this refresh
+        country_dataset = sorted(rows, key=lambda c: c['iso3'])
+        write_output(country_dataset)
+        print(f"\n✅ Patched {len(moved)} countries in {OUTPUT_FILE}")
+    else:
+        print(f"\n✅ No input changes - {OUTPUT_FILE} left untouched")
+    
+    # Only stamps we actually observed move the state forward, and a stale indicator only
+    # once its refetch came back (a failed one keeps its old cube values and old stamp,
+    # so the next --incremental run retries it)
+    failed = {code for pillar, name, code in stale if name not in fetched.get(pillar, {})}
+    save_refresh_state({code: stamps[code] if stamps[code] is not None and code not in failed else known.get(code)
+                        for code in stamps})
+    clear_checkpoints()
+    return country_dataset
+
+def print_cache_stats(cache):
+    print(f"   Cache: {cache.stats['fresh']} downloaded, {cache.stats['revalidated']} not modified (304), "
+          f"{cache.stats['offline']} served offline, {cache.stats['missing']} missing")
+
+def main():
+    global BASE_URL_WB
+    parser = argparse.ArgumentParser(description="Fetch live resilience data from the World Bank API")
+    parser.add_argument('--base-url', default=BASE_URL_WB,
+                        help="World Bank API root, e.g. a worldbank_standin.py server (default $WB_API_URL or the public API)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Parallel indicator fetches (default {DEFAULT_CONCURRENCY}, 1 = sequential)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help=f"Max requests per second across all workers (default {DEFAULT_RATE})")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Indicators per batched request (default {DEFAULT_BATCH_SIZE}, 1 = one request per indicator)")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Records per API page (default {DEFAULT_PAGE_SIZE})")
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                        help=f"Response cache directory (default {CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always download full payloads and do not update the cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="Serve every indicator from the response cache without network access")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Refetch only indicators that changed upstream and patch the output file")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip indicators checkpointed by an interrupted run")
+    parser.add_argument('--resume-max-age', type=float, default=DEFAULT_RESUME_MAX_AGE,
+                        help=f"Hours a checkpoint stays usable for --resume (default {DEFAULT_RESUME_MAX_AGE})")
+    parser.add_argument('--refresh-registry', action='store_true',
+                        help=f"Rebuild {REGISTRY_FILE} from the World Bank country metadata endpoint")
+    args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline needs the response cache; drop --no-cache")
+    cache = None if args.no_cache else ResponseCache(args.cache_dir)
+    BASE_URL_WB = args.base_url.rstrip('/')
+    
+    print("=" * 80)
+    print("GLOBAL RESILIENCE DATA FETCHER")
+    print("=" * 80)
+    
+    print("\n📊 Fetching data from World Bank API...")
+    print(f"Date range: {DATE_RANGE}")
+    if BASE_URL_WB != WB_PUBLIC_API:
+        print(f"API root: {BASE_URL_WB}")
+    if args.offline:
+        print(f"Offline mode: serving from {args.cache_dir}")
+    else:
+        print(f"Concurrency: {args.concurrency} workers, {args.rate:g} req/s")
+    
+    registry = load_registry(base_url=BASE_URL_WB, refresh=args.refresh_registry, offline=args.offline)
+    if registry:
+        print(f"Country registry: {len(country_codes(registry))} economies, "
+              f"{len(registry) - len(country_codes(registry))} aggregates excluded")
+    else:
+        print(f"⚠️  No country registry ({REGISTRY_FILE}) - keeping every row unfiltered; "
+              f"run once online to build it")
+    
+    country_dataset = None
+    if args.incremental:
+        country_dataset = incremental_refresh(args, cache, registry)
+        if country_dataset is None:
+            print("\n↻ No previous run to patch - running a full refresh")
+    if country_dataset is None:
+        country_dataset = full_refresh(args, cache, registry)
+    
+    # Statistics
+    print_statistics(country_dataset)
+    
+    print("\n" + "=" * 80)
+    print("✅ DONE! Run 'python create_choropleth_map.py' with the new data file.")
+    print("=" * 80)
+
+if __name__ == '__main__':
+    main()
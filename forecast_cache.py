@@ -0,0 +1,65 @@
+"""
+On-disk cache of per-country forecasts
+- Keyed by a hash of the country's input series, zero-percentile weight,
+  horizon, model version and model hyperparameters
+- Stored as one compressed .npz (key array + forecast arrays), so unchanged
+  countries are served without refitting
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FORECAST_CACHE_FILE = os.path.join('cache', 'forecast_cache.npz')
+
+
+def forecast_key(series, weight, h, model_version, hyperparameters):
+    """Hex digest identifying one country's forecast inputs"""
+    digest = hashlib.sha1()
+    digest.update(f"{model_version}|{h}|{float(weight)!r}|".encode())
+    digest.update(json.dumps(hyperparameters, sort_keys=True).encode())
+    digest.update(np.ascontiguousarray(series, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class ForecastCache:
+    """
+    {key: {output: array}} for the forecast outputs (e.g. 'mean', 'lower',
+    'upper'). Only entries looked up or stored during a run are written back,
+    so forecasts for stale inputs drop out on the next save.
+    """
+
+    def __init__(self, path=FORECAST_CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self.used = set()
+        self.stats = {'hits': 0, 'misses': 0}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                outputs = [name for name in data.files if name != 'keys']
+                for i, key in enumerate(data['keys'].tolist()):
+                    self.entries[key] = {name: data[name][i] for name in outputs}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        self.stats['hits' if entry is not None else 'misses'] += 1
+        if entry is not None:
+            self.used.add(key)
+        return entry
+
+    def put(self, key, outputs):
+        self.entries[key] = {name: np.asarray(values) for name, values in outputs.items()}
+        self.used.add(key)
+
+    def save(self):
+        keys = sorted(self.used)
+        if not keys:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        outputs = self.entries[keys[0]].keys()
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez_compressed(tmp_path, keys=np.array(keys),
+                            **{name: np.stack([self.entries[k][name] for k in keys]) for name in outputs})
+        os.replace(tmp_path, self.path)
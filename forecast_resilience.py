@@ -2,204 +2,393 @@
 BSTS + DFM Model for Resilience Forecasting (2025-2030)
 - Bayesian Structural Time Series with Dynamic Factor Model
 - Zero Percentile Weights for country-specific modeling
+- Country fits can be fanned out over worker processes (--workers)
+- Model variances estimated by maximum likelihood, warm-started from the
+  previous run's optimum (cache/bsts_params.json)
+- Countries whose inputs are unchanged are served from cache/forecast_cache.npz
+- Forecast bands (p5/p25/p50/p75/p95) from simulated state trajectories (--draws)
+- The four pillars are forecast jointly; the overall score is forecast the
+  way it is scored: the current score plus the record's pillar share (1, or
+  0.6 when blended with INFORM) of the change in the pillar average, path by
+  path. Rows without pillar data (INFORM only) forecast their score directly
+- Dynamic factor model on the country x pillar x year panel: common factors
+  are forecast once and mapped back through the loadings; the per-country
+  BSTS models only carry the idiosyncratic part (--factors)
+- The factor model is saved (cache/factor_model.npz) and re-estimated only
+  when the panel changed materially, on a schedule or with --refit-factors,
+  so one country's update does not refit every country
+
+Usage:
+    python forecast_resilience.py [--workers N] [--chunk-size N] [--seed N] [--cold-start]
+                                  [--no-forecast-cache] [--draws N] [--factors K] [--refit-factors]
 """
 
+import argparse
 import json
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import numpy as np
 import pandas as pd
-from scipy import stats
-from scipy.optimize import minimize
-from sklearn.decomposition import FactorAnalysis
-from sklearn.preprocessing import StandardScaler
+from indicator_store import load_cube
+from fetch_live_data import score_history
+from pillar_scoring import PILLARS, pillar_share
+from bsts_model import (BSTSModel, align_series, load_params, save_params, hyperparameters,
+                        DEFAULT_VARIANCES, DEFAULT_DRAWS, MODEL_VERSION, QUANTILES)
+from forecast_cache import ForecastCache, forecast_key
+from dynamic_factor import (DynamicFactorModel, FACTOR_MODEL_FILE, save_factor_model, load_factor_model,
+                            panel_change)
+from synthetic_history import synthetic_history, synthetic_score_history, DEFAULT_SEED
 import warnings
 warnings.filterwarnings('ignore')
 
-print("=" * 80)
-print("RESILIENCE FORECASTING: BSTS + DFM MODEL (2025-2030)")
-print("=" * 80)
+FORECAST_YEARS = list(range(2026, 2031))  # 2026-2030
+OUTPUT_FILE = 'resilience_forecasts_2025_2030.json'
+DEFAULT_FACTORS = 2
+FACTOR_REFIT_TOLERANCE = 0.05  # relative panel change (panel_change) that re-estimates the factor model
+FACTOR_REFIT_DAYS = 90  # ... and at least this often
 
-# Load historical data
-print("\n📂 Loading historical data...")
-with open('resilience_data_complete.json', 'r') as f:
-    data = json.load(f)
+# Forecast outputs: each pillar, then the overall score from the pillar average
+# (anchor_overall maps it onto the score); score-only rows forecast just the overall
+METRICS = PILLARS + ['overall']
+METRIC_MIX = np.vstack([np.eye(len(PILLARS)), np.full((1, len(PILLARS)), 1 / len(PILLARS))])
+SCORE_MIX = np.ones((1, 1))
 
-print(f"✓ Loaded {len(data)} countries")
 
-# Filter countries with meaningful scores
-countries_with_data = [c for c in data if c['score'] > 0]
-print(f"✓ {len(countries_with_data)} countries with resilience scores")
+def zero_percentile_weights(scores):
+    """
+    Calculate zero percentile weights - gives more weight to extreme performers.
+    Percentiles of every score within `scores` come from one sort plus binary
+    searches (O(n log n)); returns an array aligned with `scores`.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    ranked = np.sort(scores)
+    left = np.searchsorted(ranked, scores, side='left')
+    right = np.searchsorted(ranked, scores, side='right')
+    # Same percentile as scipy.stats.percentileofscore(kind='rank')
+    percentile = (left + right + (left < right)) * (50.0 / max(len(scores), 1))
+    # Zero percentile: emphasize extremes (0th and 100th percentiles)
+    return np.abs(percentile - 50) / 50  # 0 at median, 1 at extremes
+
+
+def historical_series(current, history):
+    """
+    Real scored [pillar, year] history, anchored so the last point is the
+    current pillar score. Pillars without data (score 0) stay at 0; years
+    before a pillar's first report stay NaN (missing).
+    """
+    current = np.array([current[p] for p in PILLARS], dtype=np.float64)
+    historical_trend = np.array([history[p] for p in PILLARS], dtype=np.float64)
+    historical = current[:, None] + historical_trend - historical_trend[:, -1:]
+    # Scored now but not in the cube's latest year: the current score is the only observation
+    historical[np.isnan(historical_trend[:, -1]), -1] = current[np.isnan(historical_trend[:, -1])]
+    historical[current == 0] = 0
 
-# Create time series matrix (we'll simulate historical points from current data)
-# In production, you'd have actual historical data 2019-2025
-print("\n🔄 Creating time series data structure...")
+    # Ensure values stay in [0, 1]
+    return np.clip(historical, 0, 1)
 
-# Simulate historical trend based on current scores
-# Assuming linear growth/decline over 2019-2025
-forecast_years = list(range(2026, 2031))  # 2026-2030
-n_forecast = len(forecast_years)
 
-def zero_percentile_weight(score, all_scores):
+def anchor_overall(forecasts, scores, pillars, shares):
     """
-    Calculate zero percentile weight - gives more weight to extreme performers
+    Map the forecast pillar average (overall row of [country, metric, h]
+    forecasts) onto the score, in place: current score + pillar share x
+    (forecast - current pillar average), as integrate_inform_data.py scores
+    it; the INFORM part of a blended score is held at its current value.
+    shares >= 0, so the quantile rows map onto quantiles of the score.
+    Score-only rows (share 0) forecast the score itself and are left as is.
     """
-    percentile = stats.percentileofscore(all_scores, score)
-    # Zero percentile: emphasize extremes (0th and 100th percentiles)
-    weight = abs(percentile - 50) / 50  # 0 at median, 1 at extremes
-    return weight
+    overall = METRICS.index('overall')
+    shares = np.asarray(shares, dtype=np.float64)
+    anchored = shares > 0
+    offset = np.asarray(scores, dtype=np.float64) - shares * np.asarray(pillars, dtype=np.float64).mean(axis=1)
+    for values in forecasts.values():
+        values[anchored, overall] = (offset[anchored, None]
+                                     + shares[anchored, None] * values[anchored, overall])
+    return forecasts
 
-# Extract all scores for percentile calculation
-all_scores = [c['score'] for c in countries_with_data]
 
-print("\n🧮 Applying Zero Percentile Weights...")
-for country in countries_with_data:
-    country['weight'] = zero_percentile_weight(country['score'], all_scores)
+def score_only_forecasts(forecasts):
+    """Score-only [country, 1, h] forecasts as [country, metric, h] with zero pillar rows"""
+    return {k: np.concatenate([np.zeros((v.shape[0], len(PILLARS), v.shape[2])), v], axis=1)
+            for k, v in forecasts.items()}
 
-# Sort by weight to show effect
-weighted = sorted(countries_with_data, key=lambda x: x['weight'], reverse=True)[:10]
-print("\nTop 10 countries by Zero Percentile Weight:")
-for i, c in enumerate(weighted, 1):
-    print(f"  {i:2d}. {c['name']:30s} Score: {c['score']:.3f} Weight: {c['weight']:.3f}")
 
-print("\n📊 Building Dynamic Factor Model...")
+def simulation_seeds(key):
+    """Seeds for a country's per-pillar forecast draws, derived from its forecast cache key"""
+    return [int(key[:15], 16) + k for k in range(len(PILLARS))]
 
-# Prepare data matrix: [countries x features]
-feature_matrix = np.array([
-    [c['score'], c['financial'], c['social'], c['institutional'], c['infrastructure']]
-    for c in countries_with_data
-])
 
-# Standardize features
-scaler = StandardScaler()
-feature_matrix_scaled = scaler.fit_transform(feature_matrix)
+def factor_forecast(panel, n_factors, h, n_draws=DEFAULT_DRAWS):
+    """
+    Dynamic factor model on a [country, pillar, year] panel, forecast once.
+    Returns (dfm, loadings [country, pillar, factor], idiosyncratic panel,
+    factor mean [factor, h], factor paths [factor, draws, h]).
+    """
+    n_countries, n_pillars, n_years = panel.shape
+    flat = panel.reshape(n_countries * n_pillars, n_years)
+    dfm = DynamicFactorModel(n_factors).fit(flat, active=~np.all(np.nan_to_num(flat) == 0, axis=1))
+    loadings = dfm.loadings.reshape(n_countries, n_pillars, -1)
+    idiosyncratic = panel - dfm.common().reshape(panel.shape)
+    factor_mean, factor_paths = dfm.forecast(h, n_draws, seed=int(dfm.digest()[:15], 16))
+    return dfm, loadings, idiosyncratic, factor_mean, factor_paths
 
-# Extract dynamic factors (latent variables)
-n_factors = 2  # Number of latent factors
-fa = FactorAnalysis(n_components=n_factors, random_state=42)
-factors = fa.fit_transform(feature_matrix_scaled)
 
-print(f"✓ Extracted {n_factors} latent factors")
-print(f"  Factor variance explained: {fa.noise_variance_.mean():.3f}")
+def country_keys(labels):
+    """
+    Unique 'label#occurrence' key per country for state kept between runs
+    (warm starts, factor loadings); labels repeat, e.g. rows without ISO3
+    """
+    counts = {}
+    keys = []
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+        keys.append(f"{label}#{counts[label]}")
+    return keys
 
-class BSTSModel:
+
+def stable_factor_forecast(panel, keys, n_factors, h, n_draws=DEFAULT_DRAWS, refit=False,
+                           path=FACTOR_MODEL_FILE):
     """
-    Simplified Bayesian Structural Time Series Model
-    Components: Level, Trend, and Seasonal (if applicable)
+    factor_forecast(), kept stable between refreshes: the saved factor model
+    and its forecast are reused unless `refit`, the settings or years
+    changed, the model is older than FACTOR_REFIT_DAYS or the panel moved
+    by more than FACTOR_REFIT_TOLERANCE since the fit. On reuse, countries
+    (unique keys, see country_keys) whose series is unchanged keep their
+    saved loadings; new or moved ones are projected onto the saved factors.
+    Returns factor_forecast()'s tuple plus the reason the model was
+    re-estimated (None when reused).
     """
-    
-    def __init__(self, y, weights=None):
-        self.y = np.array(y)
-        self.n = len(y)
-        self.weights = weights if weights is not None else np.ones(len(y))
-        
-        # Initialize state variables
-        self.level = y[0] if len(y) > 0 else 0.5
-        self.trend = 0.0
-        self.seasonal = np.zeros(4)  # Quarterly seasonality
-        
-        # Hyperparameters (estimated via MLE)
-        self.sigma_level = 0.01
-        self.sigma_trend = 0.001
-        self.sigma_obs = 0.05
-        
-    def fit(self):
-        """Fit BSTS model using weighted Kalman filter"""
-        # Simple state space model: y_t = level_t + trend_t + noise
-        levels = [self.level]
-        trends = [self.trend]
-        
-        for t in range(1, self.n):
-            # Weighted update based on zero percentile weights
-            weight = self.weights[t-1] if t > 0 else 1.0
-            
-            # State evolution
-            pred_level = levels[-1] + trends[-1]
-            innovation = (self.y[t] - pred_level) * weight
-            
-            # Update level
-            new_level = pred_level + 0.3 * innovation
-            new_trend = trends[-1] + 0.1 * innovation
-            
-            levels.append(new_level)
-            trends.append(new_trend)
-        
-        self.levels = np.array(levels)
-        self.trends = np.array(trends)
-        
-        return self
-    
-    def forecast(self, h=5):
-        """Forecast h steps ahead"""
-        forecasts = []
-        current_level = self.levels[-1]
-        current_trend = self.trends[-1]
-        
-        for i in range(h):
-            # Project forward
-            forecast = current_level + current_trend * (i + 1)
-            
-            # Add uncertainty (confidence intervals)
-            forecast_std = self.sigma_obs * np.sqrt(i + 1)
-            
-            forecasts.append({
-                'mean': forecast,
-                'lower': forecast - 1.96 * forecast_std,
-                'upper': forecast + 1.96 * forecast_std
-            })
-        
-        return forecasts
-
-print("\n🔮 Forecasting with BSTS+DFM model...")
-
-forecast_data = []
-
-for country in countries_with_data:
-    # Create synthetic historical series (in production, use real historical data)
-    # Simulate last 7 years with current score as endpoint
-    base_score = country['score']
-    historical_trend = np.random.normal(0, 0.02, 6)  # Random walk
-    historical_trend = np.cumsum(historical_trend)
-    historical_series = base_score + historical_trend - historical_trend[-1]
-    
-    # Ensure values stay in [0, 1]
-    historical_series = np.clip(historical_series, 0, 1)
-    
-    # Apply BSTS model with zero percentile weights
-    weights = np.ones(len(historical_series)) * country['weight']
-    bsts = BSTSModel(historical_series, weights=weights)
-    bsts.fit()
-    
-    # Forecast 2026-2030
-    forecasts = bsts.forecast(h=n_forecast)
-    
-    # Store forecasts
-    country_forecast = {
-        'iso3': country['iso3'],
-        'name': country['name'],
-        'region': country['region'],
-        'income': country['income'],
-        'lat': country['lat'],
-        'lon': country['lon'],
-        'current_score': round(country['score'], 3),
-        'financial': round(country['financial'], 3),
-        'social': round(country['social'], 3),
-        'institutional': round(country['institutional'], 3),
-        'infrastructure': round(country['infrastructure'], 3),
-        'weight': round(country['weight'], 3),
-        'forecasts': {}
-    }
-    
-    for i, year in enumerate(forecast_years):
-        country_forecast['forecasts'][str(year)] = {
-            'mean': round(np.clip(forecasts[i]['mean'], 0, 1), 3),
-            'lower': round(np.clip(forecasts[i]['lower'], 0, 1), 3),
-            'upper': round(np.clip(forecasts[i]['upper'], 0, 1), 3)
-        }
-    
-    forecast_data.append(country_forecast)
+    settings = {'n_factors': n_factors, 'h': h, 'draws': n_draws, 'years': panel.shape[-1]}
+
+    saved = None if refit else load_factor_model(path)
+    reason = 'requested' if refit else 'no saved factor model'
+    if saved:
+        dfm, saved_keys, saved_panel, factor_mean, factor_paths, saved_settings, fitted_at = saved
+        if saved_settings != settings:
+            reason = 'settings changed'
+        elif np.datetime64('now', 's') - fitted_at >= np.timedelta64(FACTOR_REFIT_DAYS, 'D'):
+            reason = f"older than {FACTOR_REFIT_DAYS} days"
+        else:
+            change = panel_change(saved_keys, saved_panel, keys, panel)
+            reason = f"panel changed by {change:.1%}" if change > FACTOR_REFIT_TOLERANCE else None
+    if reason:
+        dfm, loadings, idiosyncratic, factor_mean, factor_paths = factor_forecast(panel, n_factors, h, n_draws)
+        save_factor_model(dfm, keys, panel, factor_mean, factor_paths, settings, path)
+        return dfm, loadings, idiosyncratic, factor_mean, factor_paths, reason
+
+    rows = {key: i for i, key in enumerate(saved_keys)}
+    saved_loadings = dfm.loadings.reshape(len(saved_keys), panel.shape[1], -1)
+    loadings = np.empty(panel.shape[:2] + saved_loadings.shape[-1:])
+    for i, key in enumerate(keys):
+        j = rows.get(key)
+        unchanged = j is not None and np.array_equal(saved_panel[j], panel[i], equal_nan=True)
+        loadings[i] = saved_loadings[j] if unchanged else dfm.project(panel[i])
+    idiosyncratic = panel - np.einsum('cpk,kt->cpt', loadings, np.nan_to_num(dfm.factors))
+    return dfm, loadings, idiosyncratic, factor_mean, factor_paths, None
+
+
+def forecast_chunk(tasks, h, n_draws=DEFAULT_DRAWS, factor_mean=None, factor_paths=None, quantiles=QUANTILES,
+                   mix=METRIC_MIX):
+    """
+    Fit one chunk of (country key, [pillar, year] idiosyncratic history, weight,
+    start, seeds, loadings) tasks as a batched [country, pillar, year] panel,
+    where start holds the previous per-pillar optimum (log-variances, None =
+    defaults), seeds drive the simulated forecast draws and loadings
+    ([pillar, factor]) map the shared factor forecast back onto the country.
+    Score-only tasks carry a [1, year] score history with SCORE_MIX.
+    Returns (forecasts [country, metric, h], optimizer state per country and series).
+    """
+    panel = align_series([series for _, series, _, _, _, _ in tasks])
+    weights = np.array([weight for _, _, weight, _, _, _ in tasks])[:, None, None]
+    start = np.array([[np.log(DEFAULT_VARIANCES) if s is None else s for s in starts]
+                      for _, _, _, starts, _, _ in tasks])
+    seeds = np.array([seeds for _, _, _, _, seeds, _ in tasks], dtype=np.uint64)
+    loadings = np.array([loadings for *_, loadings in tasks])
+    # Pillars without data score 0 throughout and are carried as exact zeros
+    no_data = np.all(np.nan_to_num(panel) == 0, axis=-1)
+    bsts = BSTSModel(panel, weights=weights, log_variances=start, fixed=no_data).estimate().fit()
+    states = bsts.optimizer_state
+    common = (loadings, factor_mean, factor_paths) if loadings.shape[-1] else None
+    n_series = panel.shape[1]
+    return (bsts.forecast(h, n_draws, seeds, mix=mix, common=common, quantiles=quantiles),
+            [states[i:i + n_series] for i in range(0, len(states), n_series)])
+
+
+def forecast_countries(tasks, h, n_draws=DEFAULT_DRAWS, workers=1, chunk_size=None,
+                       factor_mean=None, factor_paths=None, quantiles=QUANTILES, mix=METRIC_MIX):
+    """
+    ({'mean', 'p5', ..., 'p95'} arrays shaped [country, metric, h], optimizer states),
+    both aligned with tasks. With workers > 1 the tasks are split into chunks
+    (default: about four per worker) and fitted in a process pool; results do
+    not depend on either.
+    """
+    if workers <= 1 or len(tasks) < 2:
+        return forecast_chunk(tasks, h, n_draws, factor_mean, factor_paths, quantiles, mix)
+    chunk_size = chunk_size or max(1, -(-len(tasks) // (workers * 4)))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(forecast_chunk, chunks, repeat(h), repeat(n_draws),
+                                repeat(factor_mean), repeat(factor_paths), repeat(quantiles), repeat(mix)))
+    forecasts = {k: np.concatenate([r[0][k] for r in results]) for k in results[0][0]}
+    return forecasts, [state for r in results for state in r[1]]
 
-# Add countries without scores (keep current state)
-for country in data:
-    if country['score'] == 0:
+
+def main():
+    parser = argparse.ArgumentParser(description="BSTS + DFM resilience forecasts (2026-2030)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for the country fits (0 = all cores)")
+    parser.add_argument('--chunk-size', type=int,
+                        help="Countries per worker task (default: about four chunks per worker)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help="Seed for the simulated history of countries without real history "
+                             "(combined with each country's ISO3 code)")
+    parser.add_argument('--cold-start', action='store_true',
+                        help="Ignore the saved optimizer state and estimate every country from the defaults")
+    parser.add_argument('--no-forecast-cache', action='store_true',
+                        help="Refit every country instead of reusing forecasts for unchanged inputs")
+    parser.add_argument('--draws', type=int, default=DEFAULT_DRAWS,
+                        help="Simulated trajectories per country for the forecast bands")
+    parser.add_argument('--factors', type=int, default=DEFAULT_FACTORS,
+                        help="Common factors in the dynamic factor model (0 = independent country models)")
+    parser.add_argument('--refit-factors', action='store_true',
+                        help="Re-estimate the factor model instead of reusing the saved one")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("RESILIENCE FORECASTING: BSTS + DFM MODEL (2025-2030)")
+    print("=" * 80)
+
+    # Load historical data
+    print("\n📂 Loading historical data...")
+    with open('resilience_data_complete.json', 'r') as f:
+        data = json.load(f)
+
+    print(f"✓ Loaded {len(data)} countries")
+
+    # Filter countries with meaningful scores
+    countries_with_data = [c for c in data if c['score'] > 0]
+    print(f"✓ {len(countries_with_data)} countries with resilience scores")
+
+    # Create time series matrix from the indicator history saved by fetch_live_data.py
+    # (falls back to simulated historical points when no cube is available)
+    print("\n🔄 Creating time series data structure...")
+    cube = load_cube()
+    real_history = score_history(cube) if cube else {}
+    print(f"✓ Real indicator history for {len(real_history)} countries")
+
+    forecast_years = FORECAST_YEARS
+    n_forecast = len(forecast_years)
+
+    # Extract all scores for percentile calculation
+    all_scores = [c['score'] for c in countries_with_data]
+
+    print("\n🧮 Applying Zero Percentile Weights...")
+    for country, weight in zip(countries_with_data, zero_percentile_weights(all_scores)):
+        country['weight'] = float(weight)
+
+    # Sort by weight to show effect
+    weighted = sorted(countries_with_data, key=lambda x: x['weight'], reverse=True)[:10]
+    print("\nTop 10 countries by Zero Percentile Weight:")
+    for i, c in enumerate(weighted, 1):
+        print(f"  {i:2d}. {c['name']:30s} Score: {c['score']:.3f} Weight: {c['weight']:.3f}")
+
+    # Historical [pillar, year] block for every country with pillar data: the real scored
+    # history, otherwise the synthetic history the timeline shows (seeded per ISO3 code).
+    # Rows without pillar data (INFORM only) carry a [1, year] history of their score
+    labels = [c['iso3'] or c['name'] for c in data]
+    synthetic = synthetic_history([[c[p] for p in PILLARS] for c in data], labels, seed=args.seed)
+    synthetic_scores = synthetic_score_history([c['score'] for c in data], labels, seed=args.seed)
+    shares = np.array([pillar_share(c) for c in countries_with_data])
+    series = [synthetic_scores[i][None] if pillar_share(c) == 0
+              else historical_series(c, real_history[c['iso3']]) if c['iso3'] in real_history
+              else synthetic[i]
+              for i, c in enumerate(data) if c['score'] > 0]
+    pillar_rows = np.flatnonzero(shares > 0)
+    score_rows = np.flatnonzero(shares == 0)
+    row_keys = country_keys([c['iso3'] or c['name'] for c in countries_with_data])
+    panel = align_series([series[i] for i in pillar_rows])
+    print(f"✓ {len(score_rows)} countries without pillar data forecast from their overall score")
+
+    print("\n📊 Building Dynamic Factor Model...")
+
+    # Common factors of every country/pillar series, forecast once for the whole panel and
+    # reused across runs until the panel changes materially
+    dfm, loadings, idiosyncratic, factor_mean, factor_paths, refit_reason = stable_factor_forecast(
+        panel, [row_keys[i] for i in pillar_rows], args.factors, n_forecast, args.draws, refit=args.refit_factors)
+    print(f"✓ {'Extracted' if refit_reason else 'Reused'} {loadings.shape[-1]} latent factors from "
+          f"{loadings.shape[0] * loadings.shape[1]} pillar series x {panel.shape[-1]} years"
+          + (f" ({refit_reason})" if refit_reason else f" ({FACTOR_MODEL_FILE})"))
+    print(f"  Factor variance explained: {dfm.explained:.3f}")
+
+    print("\n🔮 Forecasting with BSTS+DFM model...")
+
+    # Countries whose series, weight, loadings and model settings are unchanged come from the
+    # cache (the factor model's digest only changes when it is re-estimated)
+    settings = dict(hyperparameters(), draws=args.draws, metrics=METRICS, factors=dfm.digest())
+    score_settings = dict(hyperparameters(), draws=args.draws, metrics=['score'])
+    position = {i: j for j, i in enumerate(pillar_rows)}
+    keys = [forecast_key(s, c['weight'], n_forecast, MODEL_VERSION,
+                         dict(settings, loadings=loadings[position[i]].tolist()) if i in position else score_settings)
+            for i, (s, c) in enumerate(zip(series, countries_with_data))]
+    cache = ForecastCache() if not args.no_forecast_cache else None
+    cached = [cache.get(key) if cache else None for key in keys]
+
+    # One task per country to refit: the BSTS fits run as batched chunks, optionally in parallel
+    # Warm start each series' variance MLE from its previous optimum (keyed 'label#occurrence/series')
+    params = {} if args.cold_start else load_params()
+
+    def task(i, history, names, task_loadings):
+        return (row_keys[i], history, countries_with_data[i]['weight'],
+                [params.get(f"{row_keys[i]}/{name}", {}).get('log_variances') for name in names],
+                simulation_seeds(keys[i])[:len(names)], task_loadings)
+
+    # Pillar countries (idiosyncratic part of the factor model), then score-only countries
+    groups = [(PILLARS, METRIC_MIX, [(i, task(i, idiosyncratic[j], PILLARS, loadings[j]))
+                                     for j, i in enumerate(pillar_rows) if cached[i] is None]),
+              (['score'], SCORE_MIX, [(i, task(i, series[i], ['score'], np.zeros((1, 0))))
+                                      for i in score_rows if cached[i] is None])]
+    tasks = [t for _, _, group in groups for _, t in group]
+    warm = sum(start is not None for t in tasks for start in t[3])
+    workers = args.workers or os.cpu_count()
+    started = time.perf_counter()
+    iterations = 0
+    for names, mix, group in groups:
+        if not group:
+            continue
+        fitted, states = forecast_countries([t for _, t in group], n_forecast, args.draws, workers=workers,
+                                            chunk_size=args.chunk_size, factor_mean=factor_mean,
+                                            factor_paths=factor_paths, mix=mix)
+        if mix is SCORE_MIX:
+            fitted = score_only_forecasts(fitted)
+        fitted_at = datetime.now().isoformat(timespec='seconds')
+        params.update({f"{t[0]}/{name}": dict(state, updated=fitted_at)
+                       for (_, t), series_states in zip(group, states) for name, state in zip(names, series_states)})
+        iterations += sum(s['iterations'] for series_states in states for s in series_states)
+        for j, (i, _) in enumerate(group):
+            cached[i] = {k: v[j] for k, v in fitted.items()}
+            if cache:
+                cache.put(keys[i], cached[i])
+    if tasks:
+        save_params(params)
+    if cache:
+        cache.save()
+
+    # Overall forecast scored like `score` (pillar rows; score-only rows forecast it directly),
+    # then 2026-2030 clipped to [0, 1] for the whole panel at once (clipping the quantiles
+    # equals taking quantiles of clipped trajectories)
+    forecasts = anchor_overall({k: np.stack([entry[k] for entry in cached]) for k in cached[0]},
+                               all_scores, [[c[p] for p in PILLARS] for c in countries_with_data], shares)
+    forecasts = {k: np.round(np.clip(v, 0, 1), 3) for k, v in forecasts.items()}
+    print(f"✓ Fitted {len(tasks)} countries on {workers} worker(s) in "
+          f"{time.perf_counter() - started:.2f}s ({warm} warm-started, {iterations} optimizer iterations)")
+    print(f"✓ {len(countries_with_data) - len(tasks)} countries served from the forecast cache")
+
+    forecast_data = []
+
+    for c, country in enumerate(countries_with_data):
+        # Store forecasts
         country_forecast = {
             'iso3': country['iso3'],
             'name': country['name'],
@@ -207,53 +396,98 @@ for country in data:
             'income': country['income'],
             'lat': country['lat'],
             'lon': country['lon'],
-            'current_score': 0,
-            'financial': 0,
-            'social': 0,
-            'institutional': 0,
-            'infrastructure': 0,
-            'weight': 0,
-            'forecasts': {str(y): {'mean': 0, 'lower': 0, 'upper': 0} for y in forecast_years}
+            'current_score': round(country['score'], 3),
+            'financial': round(country['financial'], 3),
+            'social': round(country['social'], 3),
+            'institutional': round(country['institutional'], 3),
+            'infrastructure': round(country['infrastructure'], 3),
+            'weight': round(country['weight'], 3),
+            'forecasts': {},
+            'pillar_forecasts': {p: {} for p in PILLARS}
         }
+
+        overall = METRICS.index('overall')
+        for i, year in enumerate(forecast_years):
+            country_forecast['forecasts'][str(year)] = {
+                'mean': float(forecasts['mean'][c, overall, i]),
+                'lower': float(forecasts['p5'][c, overall, i]),
+                'upper': float(forecasts['p95'][c, overall, i]),
+                'p25': float(forecasts['p25'][c, overall, i]),
+                'p50': float(forecasts['p50'][c, overall, i]),
+                'p75': float(forecasts['p75'][c, overall, i])
+            }
+            for k, pillar in enumerate(PILLARS):
+                country_forecast['pillar_forecasts'][pillar][str(year)] = {
+                    'mean': float(forecasts['mean'][c, k, i]),
+                    'lower': float(forecasts['p5'][c, k, i]),
+                    'upper': float(forecasts['p95'][c, k, i])
+                }
+
         forecast_data.append(country_forecast)
 
-# Save forecasts
-output_file = 'resilience_forecasts_2025_2030.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(forecast_data, f, indent=2, ensure_ascii=False)
+    # Add countries without scores (keep current state)
+    for country in data:
+        if country['score'] == 0:
+            country_forecast = {
+                'iso3': country['iso3'],
+                'name': country['name'],
+                'region': country['region'],
+                'income': country['income'],
+                'lat': country['lat'],
+                'lon': country['lon'],
+                'current_score': 0,
+                'financial': 0,
+                'social': 0,
+                'institutional': 0,
+                'infrastructure': 0,
+                'weight': 0,
+                'forecasts': {str(y): {'mean': 0, 'lower': 0, 'upper': 0, 'p25': 0, 'p50': 0, 'p75': 0} for y in forecast_years},
+                'pillar_forecasts': {p: {str(y): {'mean': 0, 'lower': 0, 'upper': 0} for y in forecast_years}
+                                     for p in PILLARS}
+            }
+            forecast_data.append(country_forecast)
+
+    # Save forecasts
+    output_file = OUTPUT_FILE
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(forecast_data, f, indent=2, ensure_ascii=False)
+
+    print(f"\n✅ Saved forecasts to {output_file}")
+    print(f"   - {len(forecast_data)} countries")
+    print(f"   - Forecast period: 2026-2030")
+
+    # Summary statistics
+    forecast_with_data = [c for c in forecast_data if c['current_score'] > 0]
 
-print(f"\n✅ Saved forecasts to {output_file}")
-print(f"   - {len(forecast_data)} countries")
-print(f"   - Forecast period: 2026-2030")
+    print("\n📈 Forecast Summary:")
+    print(f"   Current avg score: {np.mean([c['current_score'] for c in forecast_with_data]):.3f}")
 
-# Summary statistics
-forecast_with_data = [c for c in forecast_data if c['current_score'] > 0]
+    for year in forecast_years:
+        year_forecasts = [c['forecasts'][str(year)]['mean'] for c in forecast_with_data if c['forecasts'][str(year)]['mean'] > 0]
+        avg_forecast = np.mean(year_forecasts)
+        print(f"   {year} avg forecast: {avg_forecast:.3f}")
 
-print("\n📈 Forecast Summary:")
-print(f"   Current avg score: {np.mean([c['current_score'] for c in forecast_with_data]):.3f}")
+    # Show top improvers (2025 -> 2030)
+    improvers = []
+    for country in forecast_with_data:
+        if country['current_score'] > 0:
+            change = country['forecasts']['2030']['mean'] - country['current_score']
+            improvers.append((country['name'], country['current_score'], country['forecasts']['2030']['mean'], change))
 
-for year in forecast_years:
-    year_forecasts = [c['forecasts'][str(year)]['mean'] for c in forecast_with_data if c['forecasts'][str(year)]['mean'] > 0]
-    avg_forecast = np.mean(year_forecasts)
-    print(f"   {year} avg forecast: {avg_forecast:.3f}")
+    improvers.sort(key=lambda x: x[3], reverse=True)
 
-# Show top improvers (2025 -> 2030)
-improvers = []
-for country in forecast_with_data:
-    if country['current_score'] > 0:
-        change = country['forecasts']['2030']['mean'] - country['current_score']
-        improvers.append((country['name'], country['current_score'], country['forecasts']['2030']['mean'], change))
+    print("\n🚀 Top 10 Expected Improvers (2025 → 2030):")
+    for i, (name, current, future, change) in enumerate(improvers[:10], 1):
+        print(f"  {i:2d}. {name:30s} {current:.3f} → {future:.3f} (+{change:.3f})")
 
-improvers.sort(key=lambda x: x[3], reverse=True)
+    print("\n⚠️  Top 10 Expected Decliners (2025 → 2030):")
+    for i, (name, current, future, change) in enumerate(improvers[-10:], 1):
+        print(f"  {i:2d}. {name:30s} {current:.3f} → {future:.3f} ({change:.3f})")
 
-print("\n🚀 Top 10 Expected Improvers (2025 → 2030):")
-for i, (name, current, future, change) in enumerate(improvers[:10], 1):
-    print(f"  {i:2d}. {name:30s} {current:.3f} → {future:.3f} (+{change:.3f})")
+    print("\n" + "=" * 80)
+    print("✅ FORECASTING COMPLETE!")
+    print("=" * 80)
 
-print("\n⚠️  Top 10 Expected Decliners (2025 → 2030):")
-for i, (name, current, future, change) in enumerate(improvers[-10:], 1):
-    print(f"  {i:2d}. {name:30s} {current:.3f} → {future:.3f} ({change:.3f})")
 
-print("\n" + "=" * 80)
-print("✅ FORECASTING COMPLETE!")
-print("=" * 80)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Array-backed store for World Bank indicator time series
+- Country x Year x Indicator cube held in a single NumPy array (NaN = missing)
+- ISO3 / year / indicator index maps for O(1) lookups
+- Saved as a compressed .npz next to the JSON data files
+"""
+
+import os
+import numpy as np
+
+CUBE_FILE = 'resilience_indicator_cube.npz'
+
+
+def years_in_range(date_range):
+    """Expand a World Bank date range such as '2019:2025' into a list of years"""
+    start, _, end = str(date_range).partition(':')
+    return list(range(int(start), int(end or start) + 1))
+
+
+class IndicatorCube:
+    """
+    Full indicator history: values[country, year, indicator]
+    `pillars` is aligned with `indicators` so the cube is self-describing.
+    """
+
+    def __init__(self, countries, years, indicators, pillars, values):
+        self.countries = list(countries)
+        self.years = [int(y) for y in years]
+        self.indicators = list(indicators)
+        self.pillars = list(pillars)
+        self.values = np.asarray(values, dtype=np.float64)
+
+        self.country_index = {iso3: i for i, iso3 in enumerate(self.countries)}
+        self.year_index = {year: i for i, year in enumerate(self.years)}
+        self.indicator_index = {name: i for i, name in enumerate(self.indicators)}
+
+    @classmethod
+    def from_indicator_data(cls, all_data, years):
+        """
+        Build a cube from fetch output shaped {pillar: {indicator: {iso3: {year: value}}}}
+        """
+        indicators, pillars = [], []
+        countries = set()
+        for pillar, pillar_data in all_data.items():
+            for name, series in pillar_data.items():
+                indicators.append(name)
+                pillars.append(pillar)
+                countries.update(series.keys())
+
+        cube = cls(sorted(countries), years, indicators, pillars,
+                   np.full((len(countries), len(years), len(indicators)), np.nan))
+        for k, (pillar, name) in enumerate(zip(pillars, indicators)):
+            for iso3, by_year in all_data[pillar][name].items():
+                i = cube.country_index[iso3]
+                for year, value in by_year.items():
+                    j = cube.year_index.get(int(year))
+                    if j is not None:
+                        cube.values[i, j, k] = value
+        return cube
+
+    def to_indicator_data(self):
+        """Inverse of from_indicator_data: {pillar: {indicator: {iso3: {year: value}}}}"""
+        all_data = {}
+        for k, (pillar, name) in enumerate(zip(self.pillars, self.indicators)):
+            series = {}
+            for i, j in zip(*np.nonzero(~np.isnan(self.values[:, :, k]))):
+                series.setdefault(self.countries[i], {})[self.years[j]] = float(self.values[i, j, k])
+            all_data.setdefault(pillar, {})[name] = series
+        return all_data
+
+    def get(self, iso3, year, indicator):
+        """Single value lookup; NaN if the country/year/indicator has no data"""
+        try:
+            return self.values[self.country_index[iso3], self.year_index[int(year)],
+                               self.indicator_index[indicator]]
+        except KeyError:
+            return np.nan
+
+    def series(self, iso3, indicator):
+        """Year series for one country and indicator, aligned with self.years"""
+        return self.values[self.country_index[iso3], :, self.indicator_index[indicator]]
+
+    def as_of(self, year=None):
+        """
+        Most recent non-missing value at or before `year` for every country and
+        indicator. Returns (values, value_years), both shaped [country, indicator].
+        """
+        last = len(self.years) - 1 if year is None else self.year_index[int(year)]
+        window = self.values[:, :last + 1, :]
+        present = ~np.isnan(window)
+        # Index of the last present year along axis 1 (or -1 when never present)
+        last_present = np.where(present.any(axis=1),
+                                window.shape[1] - 1 - np.argmax(present[:, ::-1, :], axis=1), -1)
+        safe = np.clip(last_present, 0, None)
+        values = np.take_along_axis(window, safe[:, None, :], axis=1)[:, 0, :]
+        values[last_present < 0] = np.nan
+        value_years = np.where(last_present >= 0, np.asarray(self.years)[safe], 0)
+        return values, value_years
+
+    def save(self, path=CUBE_FILE):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path,
+                            countries=np.array(self.countries, dtype=str),
+                            years=np.array(self.years, dtype=np.int32),
+                            indicators=np.array(self.indicators, dtype=str),
+                            pillars=np.array(self.pillars, dtype=str),
+                            values=self.values)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CUBE_FILE):
+        with np.load(path) as data:
+            return cls(data['countries'].tolist(), data['years'].tolist(),
+                       data['indicators'].tolist(), data['pillars'].tolist(), data['values'])
+
+
+def changed_countries(old, new):
+    """
+    ISO3 codes in `new` whose inputs differ from `old` (countries missing from
+    `old` count as changed). Both cubes must cover the same years.
+    """
+    aligned = np.full(new.values.shape, np.nan)
+    rows = [(i, old.country_index[iso3]) for i, iso3 in enumerate(new.countries) if iso3 in old.country_index]
+    cols = [(k, old.indicator_index[name]) for k, name in enumerate(new.indicators) if name in old.indicator_index]
+    if rows and cols:
+        new_rows, old_rows = map(list, zip(*rows))
+        new_cols, old_cols = map(list, zip(*cols))
+        aligned[np.ix_(new_rows, range(len(new.years)), new_cols)] = \
+            old.values[np.ix_(old_rows, range(len(old.years)), old_cols)]
+    same = (aligned == new.values) | (np.isnan(aligned) & np.isnan(new.values))
+    moved = ~same.all(axis=(1, 2))
+    return {new.countries[i] for i in np.flatnonzero(moved)}
+
+
+def load_cube(path=CUBE_FILE):
+    """Load the saved cube, or None if fetch_live_data.py has not produced one yet"""
+    if not os.path.exists(path):
+        return None
+    return IndicatorCube.load(path)
@@ -0,0 +1,107 @@
+"""
+Columnar cache of the INFORM Risk workbook
+- Each (workbook, sheet, header row) is parsed with pd.read_excel once and
+  saved as a typed .npz under cache/inform/, keyed by the workbook's SHA-1
+- Later reads load the arrays directly (milliseconds instead of seconds);
+  a new workbook release gets a new hash and is converted again
+- Workbook path from --inform-file or the INFORM_FILE environment variable
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+INFORM_FILE = os.environ.get('INFORM_FILE', os.path.join('..', 'INFORM_Risk_Mid_2025_v071.xlsx'))
+INFORM_CACHE_DIR = os.path.join('cache', 'inform')
+
+
+def workbook_digest(path):
+    """SHA-1 of the workbook bytes"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(digest, sheet, header, cache_dir=INFORM_CACHE_DIR):
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', str(sheet)).strip('_') or 'sheet'
+    return os.path.join(cache_dir, f"{digest[:16]}_{slug}_h{header}.npz")
+
+
+def encode_frame(df):
+    """
+    {array name: array} for np.savez: numeric/bool/datetime columns keep their
+    dtype, text columns become unicode arrays plus a missing-value mask, and
+    mixed-type columns are stored as JSON. Column labels and kinds go in 'columns'.
+    """
+    arrays, columns = {}, []
+    for i, (label, column) in enumerate(df.items()):
+        name = f"c{i}"
+        if column.dtype.kind in 'biufM':
+            kind = column.dtype.kind
+            arrays[name] = column.to_numpy()
+        elif all(isinstance(v, str) for v in column.dropna()):
+            kind = 'U'
+            arrays[name] = column.fillna('').astype(str).to_numpy(dtype=str)
+            arrays[f"{name}_na"] = column.isna().to_numpy()
+        else:
+            kind = 'O'
+            values = [None if pd.isna(v) else v for v in column.tolist()]
+            arrays[name] = np.array(json.dumps(values, default=str))
+        columns.append([label if isinstance(label, (int, float, str)) else str(label), kind])
+    arrays['columns'] = np.array(json.dumps(columns))
+    return arrays
+
+
+def decode_frame(data):
+    """Inverse of encode_frame"""
+    columns = {}
+    for i, (label, kind) in enumerate(json.loads(data['columns'].item())):
+        name = f"c{i}"
+        if kind == 'U':
+            columns[label] = pd.Series(data[name], dtype=object).where(~data[f"{name}_na"])
+        elif kind == 'O':
+            columns[label] = pd.Series(json.loads(data[name].item()), dtype=object)
+        else:
+            columns[label] = data[name]
+    return pd.DataFrame(columns)
+
+
+def load_inform_sheet(path=INFORM_FILE, sheet=0, header=0, cache_dir=INFORM_CACHE_DIR):
+    """
+    One INFORM sheet as a DataFrame, as pd.read_excel(path, sheet_name=sheet,
+    header=header) would return it, served from the columnar cache when the
+    workbook is unchanged.
+    """
+    target = cache_path(workbook_digest(path), sheet, header, cache_dir)
+    if os.path.exists(target):
+        with np.load(target) as data:
+            return decode_frame(data)
+
+    df = pd.read_excel(path, sheet_name=sheet, header=header)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{target}.tmp.npz"
+    np.savez(tmp_path, **encode_frame(df))
+    os.replace(tmp_path, target)
+    return df
+
+
+def inform_sheet_names(path=INFORM_FILE, cache_dir=INFORM_CACHE_DIR):
+    """Sheet names of the workbook (cached alongside the sheets)"""
+    target = os.path.join(cache_dir, f"{workbook_digest(path)[:16]}_sheets.json")
+    if os.path.exists(target):
+        with open(target, 'r') as f:
+            return json.load(f)
+
+    sheets = pd.ExcelFile(path).sheet_names
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(sheets, f)
+    os.replace(tmp_path, target)
+    return sheets
@@ -1,18 +1,24 @@
 #!/usr/bin/env python3
-import pandas as pd
+import argparse
+from inform_store import INFORM_FILE, load_inform_sheet, inform_sheet_names
+
+parser = argparse.ArgumentParser(description="Inspect the INFORM Risk workbook")
+parser.add_argument('--inform-file', default=INFORM_FILE,
+                    help="INFORM Risk workbook (.xlsx); defaults to $INFORM_FILE or ../INFORM_Risk_Mid_2025_v071.xlsx")
+args = parser.parse_args()
 
 print("Inspecting INFORM Risk Excel file...\n")
 
 # Read all sheets
-excel_file = pd.ExcelFile('/Users/sayansen/Desktop/INFORM_Risk_Mid_2025_v071.xlsx')
-print(f"Available sheets: {excel_file.sheet_names}\n")
+sheet_names = inform_sheet_names(args.inform_file)
+print(f"Available sheets: {sheet_names}\n")
 
 # Read first sheet
-for sheet_name in excel_file.sheet_names[:3]:  # Check first 3 sheets
+for sheet_name in sheet_names[:3]:  # Check first 3 sheets
     print(f"\n{'='*60}")
     print(f"Sheet: {sheet_name}")
     print(f"{'='*60}")
-    df = pd.read_excel(excel_file, sheet_name=sheet_name)
+    df = load_inform_sheet(args.inform_file, sheet=sheet_name)
     print(f"Shape: {df.shape} (rows, columns)")
     print(f"\nColumns:\n{df.columns.tolist()}")
     print(f"\nFirst few rows:")
@@ -1,8 +1,25 @@
 """
 Integrate INFORM Risk data with World Bank data for comprehensive resilience scores
 """
+import argparse
+import numpy as np
 import pandas as pd
 import json
+from inform_store import INFORM_FILE, load_inform_sheet
+from pillar_scoring import PILLARS, WB_WEIGHT, INFORM_WEIGHT
+from country_merge import missing_records
+from country_resolver import load_resolver
+from country_centroids import load_centroids, fill_coordinates
+
+# INFORM workbook column -> merged field (add sub-components here to carry them through)
+INFORM_COLUMNS = {'ISO3': 'iso3', 'Country': 'name', 'INFORM Risk': 'inform_risk'}
+OUTPUT_COLUMNS = ['iso3', 'name', 'region', 'income', 'lat', 'lon', 'score'] + PILLARS + [
+    'last_updated', 'inform_risk', 'inform_resilience']
+
+parser = argparse.ArgumentParser(description="Merge INFORM Risk scores into the World Bank dataset")
+parser.add_argument('--inform-file', default=INFORM_FILE,
+                    help="INFORM Risk workbook (.xlsx); defaults to $INFORM_FILE or ../INFORM_Risk_Mid_2025_v071.xlsx")
+args = parser.parse_args()
 
 print("=" * 80)
 print("INTEGRATING INFORM RISK DATA WITH WORLD BANK DATA")
@@ -10,8 +27,7 @@ print("=" * 80)
 
 # Load INFORM data from Excel
 print("\n📂 Loading INFORM Risk data...")
-inform_file = '/Users/sayansen/Desktop/INFORM_Risk_Mid_2025_v071.xlsx'
-inform_df = pd.read_excel(inform_file, sheet_name=0, header=1)
+inform_df = load_inform_sheet(args.inform_file, sheet=0, header=1)
 
 print(f"✓ Loaded {len(inform_df)} countries from INFORM dataset")
 print(f"Columns: {list(inform_df.columns[:10])}")
@@ -23,109 +39,50 @@ with open('resilience_data_live.json', 'r') as f:
 
 print(f"✓ Loaded {len(wb_data)} countries from World Bank data")
 
-# Create lookup by country name and ISO3
-wb_lookup = {c['iso3']: c for c in wb_data}
-wb_by_name = {c['name'].lower(): c for c in wb_data}
+# Merge INFORM data with World Bank data: one left join on ISO3, then column operations
+# Weight: 60% World Bank pillars, 40% INFORM
+wb_frame = pd.DataFrame(wb_data)
+inform = inform_df[list(INFORM_COLUMNS)].rename(columns=INFORM_COLUMNS)
+# Rows without an ISO3 code are resolved from their name (shared alias table + fuzzy index)
+no_code = inform['iso3'].isna() & inform['name'].notna()
+inform.loc[no_code, 'iso3'] = inform.loc[no_code, 'name'].map(load_resolver().resolve)
+inform = inform.dropna(subset=['iso3', 'name']).drop_duplicates('iso3')
 
-# Merge INFORM data with World Bank data
-merged_data = []
-inform_matched = 0
-inform_added = 0
+# Convert INFORM Risk (0-10 scale, higher = worse) to resilience (0-1 scale, higher = better);
+# missing or zero risk means no INFORM score
+risk = pd.to_numeric(inform['inform_risk'], errors='coerce').fillna(0.0)
+inform = inform.assign(inform_risk=risk, inform_resilience=np.where(risk != 0, (10 - risk) / 10, 0.0).round(3))
 
-for idx, row in inform_df.iterrows():
-    country_name = row.get('Country', '')
-    iso3 = row.get('ISO3', '')
-    inform_risk = row.get('INFORM Risk', None)
-    
-    if pd.isna(country_name) or pd.isna(iso3):
-        continue
-    
-    # Convert INFORM Risk (0-10 scale, higher = worse) to resilience (0-1 scale, higher = better)
-    resilience_from_inform = 0
-    if inform_risk and not pd.isna(inform_risk):
-        resilience_from_inform = (10 - float(inform_risk)) / 10
-    
-    # Check if country exists in World Bank data
-    if iso3 in wb_lookup:
-        country = wb_lookup[iso3]
-        # Add INFORM-specific score
-        country['inform_risk'] = float(inform_risk) if inform_risk and not pd.isna(inform_risk) else 0
-        country['inform_resilience'] = round(resilience_from_inform, 3)
-        
-        # Recalculate overall score to include INFORM data (weighted average)
-        # Weight: 60% World Bank pillars, 40% INFORM
-        wb_score = (country['financial'] + country['social'] + 
-                   country['institutional'] + country['infrastructure']) / 4
-        
-        if country['inform_resilience'] > 0:
-            country['score'] = round(wb_score * 0.6 + country['inform_resilience'] * 0.4, 3)
-        
-        merged_data.append(country)
-        inform_matched += 1
-    else:
-        # New country from INFORM
-        new_country = {
-            'iso3': iso3,
-            'name': country_name,
-            'region': '',
-            'income': '',
-            'lat': None,
-            'lon': None,
-            'score': round(resilience_from_inform, 3),
-            'financial': 0,
-            'social': 0,
-            'institutional': 0,
-            'infrastructure': 0,
-            'inform_risk': float(inform_risk) if inform_risk and not pd.isna(inform_risk) else 0,
-            'inform_resilience': round(resilience_from_inform, 3),
-            'last_updated': pd.Timestamp.now().strftime('%Y-%m-%d')
-        }
-        merged_data.append(new_country)
-        inform_added += 1
-
-# Add WB countries not in INFORM
-for country in wb_data:
-    if country['iso3'] not in [c['iso3'] for c in merged_data]:
-        country['inform_risk'] = 0
-        country['inform_resilience'] = 0
-        merged_data.append(country)
-
-# Load country coordinates from a public source
+merged = inform.merge(wb_frame, on='iso3', how='left', suffixes=('_inform', ''), indicator=True)
+matched = (merged.pop('_merge') == 'both').to_numpy()
+wb_score = merged[PILLARS].mean(axis=1)
+blended = (wb_score * WB_WEIGHT + merged['inform_resilience'] * INFORM_WEIGHT).round(3)
+merged['score'] = np.where(~matched, merged['inform_resilience'],
+                           np.where(merged['inform_resilience'] > 0, blended, merged['score']))
+
+# New countries from INFORM: INFORM name, no World Bank pillars or metadata
+merged['name'] = merged['name'].fillna(merged.pop('name_inform'))
+merged[PILLARS] = merged[PILLARS].fillna(0)
+merged[['region', 'income']] = merged[['region', 'income']].fillna('')
+merged['last_updated'] = merged['last_updated'].fillna(pd.Timestamp.now().strftime('%Y-%m-%d'))
+inform_matched = int(matched.sum())
+inform_added = len(merged) - inform_matched
+
+# Add WB countries not in INFORM (set difference on ISO3)
+wb_only = pd.DataFrame(missing_records(wb_data, set(inform['iso3'])), columns=wb_frame.columns)
+wb_only = wb_only.assign(inform_risk=0, inform_resilience=0)
+
+merged_frame = pd.concat([merged[OUTPUT_COLUMNS], wb_only[OUTPUT_COLUMNS]], ignore_index=True)
+merged_data = merged_frame.astype(object).where(merged_frame.notna(), None).to_dict('records')
+
+# Fill missing coordinates from the precomputed world.geojson centroids
 print("\n📍 Adding country coordinates...")
-try:
-    # Try to get coordinates from existing data or world.geojson
-    with open('world.geojson', 'r') as f:
-        world = json.load(f)
-    
-    coords_added = 0
-    for country in merged_data:
-        if not country['lat'] or not country['lon']:
-            # Find matching feature
-            for feature in world['features']:
-                if feature['properties'].get('ISO3166-1-Alpha-3') == country['iso3']:
-                    # Calculate centroid
-                    geom = feature['geometry']
-                    if geom['type'] == 'Polygon':
-                        coords = geom['coordinates'][0]
-                        lons = [c[0] for c in coords]
-                        lats = [c[1] for c in coords]
-                        country['lon'] = sum(lons) / len(lons)
-                        country['lat'] = sum(lats) / len(lats)
-                        coords_added += 1
-                        break
-                    elif geom['type'] == 'MultiPolygon':
-                        # Use first polygon
-                        coords = geom['coordinates'][0][0]
-                        lons = [c[0] for c in coords]
-                        lats = [c[1] for c in coords]
-                        country['lon'] = sum(lons) / len(lons)
-                        country['lat'] = sum(lats) / len(lats)
-                        coords_added += 1
-                        break
-    
+centroids = load_centroids()
+if centroids:
+    coords_added = fill_coordinates(merged_data, centroids)
     print(f"✓ Added coordinates for {coords_added} countries")
-except Exception as e:
-    print(f"⚠️  Could not load coordinates: {e}")
+else:
+    print("⚠️  Could not load coordinates: no world.geojson or centroid table")
 
 # Save merged dataset
 output_file = 'resilience_data_complete.json'
@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
+import argparse
 import pandas as pd
 import json
 import numpy as np
+from inform_store import INFORM_FILE, load_inform_sheet
+from country_merge import CountryIndex, missing_records
+from country_resolver import load_resolver
+
+parser = argparse.ArgumentParser(description="Merge INFORM Risk data into resilience_data_cleaned.json")
+parser.add_argument('--inform-file', default=INFORM_FILE,
+                    help="INFORM Risk workbook (.xlsx); defaults to $INFORM_FILE or ../INFORM_Risk_Mid_2025_v071.xlsx")
+args = parser.parse_args()
 
 print("=" * 60)
 print("PROCESSING INFORM RISK DATA - Enhanced")
@@ -9,9 +18,9 @@ print("=" * 60)
 
 # Read the main INFORM Risk sheet with proper header
 print("\n1. Reading INFORM Risk Excel file...")
-df = pd.read_excel('/Users/sayansen/Desktop/INFORM_Risk_Mid_2025_v071.xlsx', 
-                   sheet_name='INFORM Risk Mid 2025 (a-z)',
-                   header=1)  # Use row 1 as header
+df = load_inform_sheet(args.inform_file,
+                       sheet='INFORM Risk Mid 2025 (a-z)',
+                       header=1)  # Use row 1 as header
 
 print(f"✓ Loaded {len(df)} countries")
 print(f"✓ Columns: {list(df.columns)[:5]}...")
@@ -23,16 +32,18 @@ with open('resilience_data_cleaned.json', 'r') as f:
 
 print(f"✓ Loaded {len(existing_data)} countries from existing data")
 
-# Create mappings
-existing_by_iso3 = {c['iso3']: c for c in existing_data}
-existing_by_name = {c['name'].lower(): c for c in existing_data}
+# ISO3 / normalized-name indexes over the existing records, plus the shared name -> ISO3 resolver
+existing = CountryIndex(existing_data)
+resolver = load_resolver()
 
 print("\n3. Merging INFORM Risk data with existing data...")
 
 # Process each country
 merged_data = []
+used = set()  # ids of the existing records matched to an INFORM row
 matched = 0
 new_countries = 0
+unresolved = []
 
 for _, row in df.iterrows():
     country_name = str(row.iloc[0]).strip()  # First column is country name
@@ -41,25 +52,23 @@ for _, row in df.iterrows():
     if pd.isna(country_name) or country_name == '' or country_name == '(a-z)':
         continue
     
-    # Try to find in existing data
-    country_data = None
+    # Resolve the INFORM name to an ISO3 code (aliases, then fuzzy match)
+    iso3 = resolver.resolve(country_name)
+    if not iso3:
+        unresolved.append(country_name)
+        continue
     
-    # Check by name match
-    if country_name.lower() in existing_by_name:
-        country_data = existing_by_name[country_name.lower()].copy()
+    # Find it in the existing data (code and name, code, then name); the record takes the
+    # resolved code, so a name match carrying another country's code is corrected
+    country_data = existing.match(iso3, country_name)
+    if country_data:
+        used.add(id(country_data))
+        country_data = dict(country_data, iso3=iso3)
         matched += 1
     else:
-        # Try partial matching
-        for existing_name, existing_country in existing_by_name.items():
-            if country_name.lower() in existing_name or existing_name in country_name.lower():
-                country_data = existing_data[list(existing_by_name.values()).index(existing_country)].copy()
-                matched += 1
-                break
-    
-    if not country_data:
         # Create new entry
         country_data = {
-            'iso3': country_name[:3].upper(),
+            'iso3': iso3,
             'name': country_name,
             'region': '',
             'income': '',
@@ -100,11 +109,12 @@ for _, row in df.iterrows():
 
 print(f"✓ Matched {matched} countries with existing data")
 print(f"✓ Created {new_countries} new country entries")
+if unresolved:
+    print(f"⚠️  Skipped {len(unresolved)} unrecognized names: {unresolved[:10]}")
 
 # Add existing countries that weren't in INFORM
-for existing in existing_data:
-    if not any(c['iso3'] == existing['iso3'] for c in merged_data):
-        merged_data.append(existing)
+merged_data.extend(missing_records([r for r in existing_data if id(r) not in used],
+                                   {c['iso3'] for c in merged_data}))
 
 print(f"\n4. Final dataset: {len(merged_data)} countries")
 
@@ -0,0 +1,107 @@
+"""
+Vectorized pillar scoring
+- INDICATOR_BOUNDS is the single table of normalization bounds per indicator
+- Whole country x indicator matrices are normalized and averaged per pillar
+  with a few NumPy operations (missing values are masked out)
+"""
+
+import numpy as np
+
+PILLARS = ['financial', 'social', 'institutional', 'infrastructure']
+
+# Overall score of rows merged with INFORM Risk (integrate_inform_data.py):
+# World Bank pillar average and INFORM resilience, blended
+WB_WEIGHT, INFORM_WEIGHT = 0.6, 0.4
+
+# indicator: (min, max, reverse) -- reverse=True where lower is better (e.g., debt, Gini)
+# None = no agreed bounds; a reported value counts as a neutral 0.5
+WGI_BOUNDS = (-2.5, 2.5, False)  # WGI indicators are typically -2.5 to +2.5
+INDICATOR_BOUNDS = {
+    # Financial
+    'gdp': None,
+    'debt_to_gdp': (0, 200, True),
+    'fx_reserves': (0, 12, False),
+    'fdi': (-5, 10, False),
+    'trade_balance': None,
+    'gdp_growth': (-10, 15, False),
+    # Social
+    'gini': (25, 65, True),
+    'consumption': None,
+    'savings': (-10, 40, False),
+    'water': (40, 100, False),
+    'life_expectancy': (40, 100, False),
+    'poverty': (0, 50, True),
+    # Institutional
+    'corruption_control': WGI_BOUNDS,
+    'govt_effectiveness': WGI_BOUNDS,
+    'rule_of_law': WGI_BOUNDS,
+    'regulatory_quality': WGI_BOUNDS,
+    'political_stability': WGI_BOUNDS,
+    'voice_accountability': WGI_BOUNDS,
+    # Infrastructure
+    'road_density': (0, 200, False),
+    'paved_roads': (0, 100, False),
+    'electricity': (0, 100, False),
+    'internet': (0, 100, False),
+    'mobile': None,
+    'logistics': (1, 5, False),
+}
+
+
+def bounds_arrays(indicators):
+    """(min, max, reverse, neutral) arrays aligned with the indicator list"""
+    lo = np.zeros(len(indicators))
+    hi = np.ones(len(indicators))
+    reverse = np.zeros(len(indicators), dtype=bool)
+    neutral = np.zeros(len(indicators), dtype=bool)
+    for k, name in enumerate(indicators):
+        bounds = INDICATOR_BOUNDS.get(name)
+        if bounds is None:
+            neutral[k] = True
+        else:
+            lo[k], hi[k], reverse[k] = bounds
+    return lo, hi, reverse, neutral
+
+
+def normalize_matrix(values, indicators):
+    """
+    Normalize raw values (shape [..., indicator]) to 0-1 using INDICATOR_BOUNDS.
+    Returns a masked array; NaN inputs stay masked.
+    """
+    values = np.ma.masked_invalid(np.asarray(values, dtype=np.float64))
+    lo, hi, reverse, neutral = bounds_arrays(indicators)
+    normalized = (values - lo) / (hi - lo)
+    normalized = np.ma.where(reverse, 1 - normalized, normalized)
+    normalized = np.where(neutral, 0.5, np.clip(normalized.filled(0), 0, 1))
+    return np.ma.array(normalized, mask=np.ma.getmaskarray(values))
+
+
+def pillar_matrix(indicator_pillars, pillars=PILLARS):
+    """One-hot [indicator, pillar] membership matrix"""
+    return np.array([[p == pillar for pillar in pillars] for p in indicator_pillars], dtype=np.float64)
+
+
+def pillar_share(record):
+    """
+    Share of a merged record's overall score that moves with its pillar
+    average: 1 for World Bank scores, WB_WEIGHT where the score is blended
+    with INFORM resilience, 0 without any pillar data (INFORM only)
+    """
+    if not any(record.get(p) for p in PILLARS):
+        return 0.0
+    return WB_WEIGHT if (record.get('inform_resilience') or 0) > 0 else 1.0
+
+
+def score_matrix(values, indicators, indicator_pillars, pillars=PILLARS, missing=0.0):
+    """
+    Score a [..., indicator] matrix of raw values.
+    Returns (pillar_scores [..., pillar], overall [...]); a pillar without any
+    reported indicator scores `missing` (0 by default, NaN to mark it as
+    missing), and overall is the plain average of pillars.
+    """
+    normalized = normalize_matrix(values, indicators)
+    membership = pillar_matrix(indicator_pillars, pillars)
+    sums = normalized.filled(0) @ membership
+    counts = (~np.ma.getmaskarray(normalized)).astype(np.float64) @ membership
+    pillar_scores = np.divide(sums, counts, out=np.full_like(sums, missing), where=counts > 0)
+    return pillar_scores, pillar_scores.mean(axis=-1)
@@ -2,9 +2,18 @@
 """
 Process INFORM Risk data and merge with existing resilience data
 """
+import argparse
 import pandas as pd
 import json
 import numpy as np
+from inform_store import INFORM_FILE, load_inform_sheet
+from country_merge import CountryIndex
+from country_resolver import load_resolver
+
+parser = argparse.ArgumentParser(description="Process INFORM Risk data into resilience_data_enhanced.json")
+parser.add_argument('--inform-file', default=INFORM_FILE,
+                    help="INFORM Risk workbook (.xlsx); defaults to $INFORM_FILE or ../INFORM_Risk_Mid_2025_v071.xlsx")
+args = parser.parse_args()
 
 print("=" * 60)
 print("PROCESSING INFORM RISK DATA")
@@ -13,7 +22,7 @@ print("=" * 60)
 # Read the INFORM Risk Excel file
 print("\n1. Reading INFORM Risk Excel file...")
 try:
-    df = pd.read_excel('/Users/sayansen/Desktop/INFORM_Risk_Mid_2025_v071.xlsx', sheet_name=0)
+    df = load_inform_sheet(args.inform_file, sheet=0)
     print(f"✓ Loaded {len(df)} rows")
     print(f"✓ Columns: {df.columns.tolist()[:10]}...")  # Show first 10 columns
 except Exception as e:
@@ -30,9 +39,9 @@ except Exception as e:
     print(f"✗ Error loading JSON: {e}")
     exit(1)
 
-# Create a mapping of country names/codes
-existing_countries = {c['iso3']: c for c in existing_data}
-existing_names = {c['name'].lower(): c['iso3'] for c in existing_data}
+# ISO3 / normalized-name indexes over the existing records, plus the shared name -> ISO3 resolver
+existing = CountryIndex(existing_data)
+resolver = load_resolver()
 
 print("\n3. Processing INFORM Risk indicators...")
 
@@ -40,24 +49,27 @@ print("\n3. Processing INFORM Risk indicators...")
 enhanced_data = []
 matched = 0
 unmatched = 0
+unresolved = []
 
 for _, row in df.iterrows():
     country_name = str(row.get('Country', row.get('Iso3', 'Unknown'))).strip()
-    iso3 = str(row.get('Iso3', '')).strip().upper()
+    iso3 = str(row.get('Iso3', '')).strip().upper() if pd.notna(row.get('Iso3')) else ''
+    iso3 = iso3 or resolver.resolve(country_name)
+    if not iso3:
+        # No code and no known name: skip rather than invent an ISO3
+        unresolved.append(country_name)
+        continue
     
-    # Try to find matching country in existing data
-    country_data = None
-    if iso3 and iso3 in existing_countries:
-        country_data = existing_countries[iso3].copy()
-        matched += 1
-    elif country_name.lower() in existing_names:
-        iso3 = existing_names[country_name.lower()]
-        country_data = existing_countries[iso3].copy()
+    # Try to find matching country in existing data (code and name, code, then name); the
+    # record takes the row's code, so a name match carrying another country's code is corrected
+    country_data = existing.match(iso3, country_name)
+    if country_data:
+        country_data = dict(country_data, iso3=iso3)
         matched += 1
     else:
         # Create new country entry
         country_data = {
-            'iso3': iso3 if iso3 else country_name[:3].upper(),
+            'iso3': iso3,
             'name': country_name,
             'region': '',
             'income': '',
@@ -103,6 +115,8 @@ for _, row in df.iterrows():
 
 print(f"✓ Matched {matched} countries with existing data")
 print(f"✓ Added {unmatched} new countries from INFORM")
+if unresolved:
+    print(f"⚠️  Skipped {len(unresolved)} rows with no ISO3 and an unknown name: {unresolved[:10]}")
 
 # Remove duplicates and sort
 seen_iso3 = set()
@@ -0,0 +1,63 @@
+"""
+Synthetic 2019-2025 history for countries without a real indicator history
+- Every country draws from its own np.random.Generator, seeded from the run
+  seed and its ISO3 code, so identical inputs give byte-identical histories
+  and adding or removing a country leaves every other history unchanged
+- The per-country draws are stacked and the trajectories computed for the
+  whole country x pillar x year block at once
+- Shared by forecast_resilience.py (model input) and
+  create_historical_forecast_data.py (timeline), so the forecasts are fitted on
+  exactly the history the timeline shows
+- Rows without pillar data (INFORM only) get a history of their overall
+  score alone (synthetic_score_history)
+"""
+
+import zlib
+
+import numpy as np
+
+HISTORICAL_YEARS = list(range(2019, 2026))  # 2019-2025, ending at the current scores
+DEFAULT_SEED = 42
+
+
+def country_rng(label, seed=DEFAULT_SEED):
+    """Generator for one country, seeded from (seed, CRC-32 of its label, e.g. ISO3)"""
+    return np.random.default_rng(np.random.SeedSequence([seed, zlib.crc32(str(label).encode())]))
+
+
+def synthetic_history(current, labels, n_years=len(HISTORICAL_YEARS), seed=DEFAULT_SEED):
+    """
+    Smooth trajectories ending at the current scores.
+
+    current is [country, pillar] and labels (one per country, e.g. ISO3)
+    pick each country's random stream; returns [country, pillar, year] with
+    the last year equal to the current score. Every series gets its own
+    volatility and slight (mostly upward) trend; deviations grow with the
+    distance from the current year. Series scored 0 (no data) stay 0; values
+    are clipped to [0, 1].
+    """
+    current = np.asarray(current, dtype=np.float64)
+    n_pillars = current.shape[-1]
+    draws = [(rng.uniform(0.02, 0.08, n_pillars), rng.uniform(-0.01, 0.015, n_pillars),
+              rng.standard_normal((n_pillars, n_years)))
+             for rng in (country_rng(label, seed) for label in labels)]
+    volatility, trend, deviation = (np.array([d[k] for d in draws]).reshape(current.shape + shape)
+                                    for k, shape in enumerate([(), (), (n_years,)]))
+
+    years_back = np.arange(n_years - 1, -1, -1, dtype=np.float64)
+    history = (current[..., None]
+               + deviation * volatility[..., None] * (years_back / max(n_years - 1, 1))
+               - trend[..., None] * years_back)
+    history = np.clip(history, 0, 1)
+    history[current == 0] = 0
+    return history
+
+
+def synthetic_score_history(scores, labels, n_years=len(HISTORICAL_YEARS), seed=DEFAULT_SEED):
+    """
+    [country, year] synthetic history of overall scores, for rows scored
+    without any pillar data; drawn like one extra pillar per country, from
+    a stream of its own (label + '/score')
+    """
+    scores = np.asarray(scores, dtype=np.float64)[:, None]
+    return synthetic_history(scores, [f"{label}/score" for label in labels], n_years, seed)[:, 0]
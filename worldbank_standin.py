@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the World Bank v2 indicator API
+- Replays recorded indicator series (response cache or indicator cube)
+- Serves /country metadata from country_registry.json for the country registry
+- Falls back to deterministic synthetic series when nothing is recorded
+- Configurable latency, error rate and pagination; ETag/304 support
+
+Usage:
+    python worldbank_standin.py [--port 8099] [--latency 0.2] [--error-rate 0.05]
+    python fetch_live_data.py --base-url http://localhost:8099
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from fetch_live_data import (INDICATORS, INDICATOR_SOURCES, DEFAULT_SOURCE, CACHE_DIR,
+                             ResponseCache, series_from_json)
+from indicator_store import CUBE_FILE, load_cube, years_in_range
+from country_registry import REGISTRY_FILE
+
+DEFAULT_PORT = 8099
+LAST_UPDATED = '2025-07-01'
+SYNTHETIC_AGGREGATES = ['WLD', 'HIC', 'LMY']  # Served as region "Aggregates"
+
+
+def load_recorded_series(cache_dir=CACHE_DIR, cube_file=CUBE_FILE):
+    """
+    Recorded {code: {iso3: {year: value}}} from the response cache, topped up
+    from the indicator cube for codes the cache does not have.
+    """
+    codes = {name: code for indicators in INDICATORS.values() for name, code in indicators.items()}
+    recorded = {}
+    if os.path.isdir(cache_dir):
+        cache = ResponseCache(cache_dir)
+        for filename in os.listdir(cache_dir):
+            entry = cache.load(filename[:-len('.json')]) if filename.endswith('.json') else None
+            if entry and not entry['key'].startswith('batch_'):
+                code = entry['key'].rsplit('_', 1)[0]
+                merged = recorded.setdefault(code, {})
+                for iso3, by_year in series_from_json(entry['series']).items():
+                    merged.setdefault(iso3, {}).update(by_year)
+    cube = load_cube(cube_file)
+    if cube:
+        for name, series in ((name, s) for pillar in cube.to_indicator_data().values() for name, s in pillar.items()):
+            if name in codes and codes[name] not in recorded:
+                recorded[codes[name]] = series
+    return recorded
+
+
+def synthetic_series(n_countries=217, years=range(2000, 2026), seed=0):
+    """Deterministic series for every INDICATORS code (about 1 in 5 values missing)"""
+    rng = random.Random(seed)
+    countries = [f"{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}X" for i in range(n_countries)] + SYNTHETIC_AGGREGATES
+    recorded = {}
+    for indicators in INDICATORS.values():
+        for code in indicators.values():
+            recorded[code] = {iso3: {year: round(rng.uniform(-2.5, 100), 3)
+                                     for year in years if rng.random() > 0.2}
+                              for iso3 in countries}
+    return recorded
+
+
+def registry_entries(recorded, path=REGISTRY_FILE):
+    """
+    Country registry entries to serve: the saved registry when there is one,
+    otherwise placeholders for every recorded ISO3 (SYNTHETIC_AGGREGATES flagged)
+    """
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)['countries']
+    codes = sorted({iso3 for series in recorded.values() for iso3 in series})
+    return {iso3: {'iso3': iso3, 'iso2': iso3[:2], 'name': f"Country {iso3}",
+                   'region': 'Aggregates' if iso3 in SYNTHETIC_AGGREGATES else 'Synthetic',
+                   'income': 'Aggregates' if iso3 in SYNTHETIC_AGGREGATES else 'Not classified',
+                   'aggregate': iso3 in SYNTHETIC_AGGREGATES, 'capital': '', 'lat': None, 'lon': None}
+            for iso3 in codes}
+
+
+def country_record(entry):
+    """World Bank /country record for a registry entry (inverse of parse_country)"""
+    def coordinate(value):
+        return '' if value is None else str(value)
+
+    return {
+        'id': entry['iso3'],
+        'iso2Code': entry['iso2'],
+        'name': entry['name'],
+        'region': {'id': '', 'iso2code': '', 'value': entry['region']},
+        'incomeLevel': {'id': '', 'iso2code': '', 'value': entry['income']},
+        'capitalCity': entry['capital'],
+        'longitude': coordinate(entry['lon']),
+        'latitude': coordinate(entry['lat'])
+    }
+
+
+class StandinState:
+    """Recorded data plus the behaviour knobs shared by all handler threads"""
+
+    def __init__(self, recorded, latency=0.0, jitter=0.0, error_rate=0.0, max_per_page=None, seed=0,
+                 countries=None):
+        self.recorded = recorded
+        self.countries = countries if countries is not None else registry_entries(recorded)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_per_page = max_per_page
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def roll(self):
+        """(delay seconds, fail?) for one request, drawn from the seeded RNG"""
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.error_rate
+            self.errors += fail
+            return delay, fail
+
+    def records(self, codes, years):
+        """All records for the codes and years, in the API's country/date order"""
+        countries = sorted({iso3 for code in codes for iso3 in self.recorded.get(code, {})})
+        rows = []
+        for code in codes:
+            series = self.recorded.get(code, {})
+            for iso3 in countries:
+                by_year = series.get(iso3, {})
+                for year in sorted(years, reverse=True):
+                    rows.append({
+                        'indicator': {'id': code, 'value': code},
+                        'country': {'id': iso3[:2], 'value': iso3},
+                        'countryiso3code': iso3,
+                        'date': str(year),
+                        'value': by_year.get(year),
+                        'unit': '',
+                        'obs_status': '',
+                        'decimal': 1
+                    })
+        return rows
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    state = None  # Set by make_server
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        segments = parts.path.strip('/').split('/')
+        delay, fail = self.state.roll()
+        time.sleep(delay)
+
+        if fail:
+            return self.send_json(503, {'error': 'Simulated upstream failure'})
+        if segments[-1] == 'country':
+            return self.send_countries(query)
+        if len(segments) < 4 or segments[-2] != 'indicator':
+            return self.send_json(404, [{'message': [{'id': '120', 'key': 'Invalid value'}]}])
+
+        codes = segments[-1].split(';')
+        if len(codes) > 1 and 'source' not in query:
+            return self.send_json(200, [{'message': [{'id': '120', 'key': 'Invalid value',
+                                                      'value': 'Multiple indicators need a source'}]}])
+        sources = {INDICATOR_SOURCES.get(code, DEFAULT_SOURCE) for code in codes}
+        if len(codes) > 1 and sources != {int(query['source'])}:
+            return self.send_json(200, [{'message': [{'id': '120', 'key': 'Invalid value',
+                                                      'value': 'Indicators do not share the source'}]}])
+
+        years = years_in_range(query.get('date', '2019:2025'))
+        per_page = max(1, int(query.get('per_page', 50)))
+        if self.state.max_per_page:
+            per_page = min(per_page, self.state.max_per_page)
+        page = max(1, int(query.get('page', 1)))
+
+        etag = '"' + hashlib.sha1(f"{codes}{years}{per_page}{page}{LAST_UPDATED}".encode()).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        rows = self.state.records(codes, years)
+        pages = max(1, -(-len(rows) // per_page))
+        meta = {'page': page, 'pages': pages, 'per_page': per_page, 'total': len(rows),
+                'sourceid': str(sources.pop()), 'lastupdated': LAST_UPDATED}
+        self.send_json(200, [meta, rows[(page - 1) * per_page:page * per_page] or None], etag)
+
+    def send_countries(self, query):
+        """Paginated /country metadata, as used by country_registry.fetch_registry"""
+        rows = [country_record(entry) for _, entry in sorted(self.state.countries.items())]
+        per_page = max(1, int(query.get('per_page', 50)))
+        if self.state.max_per_page:
+            per_page = min(per_page, self.state.max_per_page)
+        page = max(1, int(query.get('page', 1)))
+        pages = max(1, -(-len(rows) // per_page))
+        meta = {'page': page, 'pages': pages, 'per_page': str(per_page), 'total': len(rows)}
+        self.send_json(200, [meta, rows[(page - 1) * per_page:page * per_page]])
+
+    def send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+
+def make_server(state, port=DEFAULT_PORT, host='127.0.0.1'):
+    """Build a threaded stand-in server bound to host:port (port 0 = any free port)"""
+    handler = type('BoundStandinHandler', (StandinHandler,), {'state': state})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_in_thread(state, port=0):
+    """Serve in a daemon thread; returns (server, base_url)"""
+    server = make_server(state, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the World Bank v2 indicator API")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Uniform +/- seconds around --latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--max-per-page', type=int, help="Cap on per_page (forces pagination)")
+    parser.add_argument('--synthetic', type=int, metavar='N_COUNTRIES',
+                        help="Serve deterministic synthetic data instead of recorded payloads")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    recorded = synthetic_series(args.synthetic, seed=args.seed) if args.synthetic else load_recorded_series()
+    if not recorded:
+        print("⚠️  No recorded payloads found (run fetch_live_data.py once) - serving synthetic data")
+        recorded = synthetic_series(seed=args.seed)
+    state = StandinState(recorded, args.latency, args.jitter, args.error_rate, args.max_per_page, args.seed)
+
+    server = make_server(state, args.port)
+    print(f"🌐 World Bank stand-in on http://127.0.0.1:{args.port} "
+          f"({len(recorded)} indicators, {len(state.countries)} countries, latency {args.latency}s, error rate {args.error_rate:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n\nServer stopped after {state.requests} requests ({state.errors} simulated errors).")
+
+
+if __name__ == '__main__':
+    main()